@@ -8,4 +8,5 @@ echo -e "\033[0;36m[Run] Starting uvicorn server\033[0m"
 
 export PYTHONUNBUFFERED=1
 
-python -m uvicorn src.api.app:app --host 0.0.0.0 --port 8000 "$@"
+# uvloop event loop + httptools parser (both from uvicorn[standard])
+python -m uvicorn src.api.app:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools "$@"
@@ -1,30 +1,46 @@
 from __future__ import annotations
+import asyncio
+import logging
 from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 from datetime import datetime
 from pathlib import Path
 import platform
+import secrets
 import time
 import uuid
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse
 import openai
 from src.config import settings
-from src.embeddings import get_embedding_dimension
+from src.database.connection import warm_ro_pool, dispose_ro_engine
+from src.vector_db.qdrant_client import close_qdrant_client
+from src.embeddings import get_embedding_dimension, get_embedding_from_cache
 from src.logger import get_logger
 from src.orchestration.retriever import DataRetriever
-from src.orchestration.router import QueryRouter
-from src.llm.response_generator import ResponseGenerator
-from src.cache.session import SessionManager
+from src.orchestration.router import get_query_router
+from src.llm.response_generator import LLM_FALLBACK_RESPONSE, LLMResponseError, get_response_generator
+from src.cache.session import get_session_manager, close_redis_client
+from src.cache.response import get_response_cache
+from src.cache.stream_log import get_stream_log
 from .schemas import ChatRequest, ChatResponse
+from .middleware import RequestContextMiddleware
 from .helpers import (
-    PostgreSQLEncoder,
+    PostgresORJSONResponse,
+    SSEResponse,
+    chat_json_response,
+    await_session_write,
     mask_dsn,
-    build_compact_context,
-    build_history_text,
-    generate_stream_response,
-    generate_out_of_domain_response,
+    build_llm_context,
+    encode_retrieved_rows,
+    llm_response_scope,
+    find_relevant_conversations,
+    generate_chat_stream,
+    resumable_stream,
+    replay_stream,
     OUT_OF_DOMAIN_RESPONSE,
 )
 
@@ -33,15 +49,39 @@ logger = get_logger(__name__)
 # Path to test client
 TEST_CLIENT_DIR = Path(__file__).parent.parent.parent / "test_client"
 
+# Entropy of the per-stream resume token (token_urlsafe -> ~22 characters)
+STREAM_ID_BYTES = 16
+
+def warm_shared_components():
+    """Build the shared singletons up front so the first request doesn't pay for tokenizer/client setup."""
+    for getter in (get_session_manager, get_query_router, get_response_generator):
+        try:
+            getter()
+        except Exception as e:
+            # Leave it to the first request to surface (e.g. missing API keys)
+            logger.warning(f"Could not pre-build {getter.__name__}: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown."""
     logger.info("Starting Journalyst AI Assistant API...")
     logger.info(f"Test client available at: http://localhost:8000/")
+    await asyncio.to_thread(warm_ro_pool)
+    await asyncio.to_thread(warm_shared_components)
+    get_static_health_info()
     yield
     logger.info("Shutting down Journalyst AI Assistant API...")
+    dispose_ro_engine()
+    close_qdrant_client()
+    await close_redis_client()
 
-app = FastAPI(title="Journalyst AI Assistant", version="0.1.0", docs_url="/docs", lifespan=lifespan)
+app = FastAPI(
+    title="Journalyst AI Assistant",
+    version="0.1.0",
+    docs_url="/docs",
+    lifespan=lifespan,
+    default_response_class=PostgresORJSONResponse
+)
 
 # CORS middleware - allow cross-origin requests from test client
 app.add_middleware(
@@ -52,89 +92,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# No compression middleware on purpose: gzip/brotli would hold SSE frames until the compression window
+# fills. If one is added, it must skip text/event-stream (Starlette's GZipMiddleware does by default, and
+# SSEResponse also sends Content-Encoding: identity, which compressors leave alone).
+
+# Stamps request_id and start time on request.state (pure ASGI, no per-request task overhead)
+app.add_middleware(RequestContextMiddleware)
+
 # Mount static files for test client (CSS, JS)
 if TEST_CLIENT_DIR.exists():
     app.mount("/static", StaticFiles(directory=TEST_CLIENT_DIR), name="static")
 
-@app.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def prepare_chat_turn(request: ChatRequest) -> dict:
     """
-    Chat endpoint supporting both streaming and non-streaming responses.
-    Set request.stream=true for SSE streaming.
+    Session lookup, follow-up scoping, retrieval and query-context storage for one chat turn.
+    Shared by the streaming and non-streaming paths; returns the state the LLM step needs.
     """
-    request_id = str(uuid.uuid4())[:8]
-    start_time = time.perf_counter()
-    query_preview = request.query[:60] + "..." if len(request.query) > 60 else request.query
-    
-    logger.info("[API] " + "="*60)
-    logger.info(f"[API] REQUEST START | id={request_id} | user={request.user_id} | stream={request.stream} | session_id={request.session_id[:8] + '...' if request.session_id else 'none'}")
-    logger.info(f"[API] Query: '{query_preview}'")
+    # Embed the query concurrently with session lookup and follow-up detection; retrieval reuses the result
+    embed_task = asyncio.create_task(asyncio.to_thread(get_embedding_from_cache, request.query))
 
     try:
-        # Session management - create session if needed
+        # Session management - create session if needed. New sessions aren't written yet:
+        # the background write after retrieval persists them together with this turn
         logger.info(f"[API] Managing session...")
-        session_mgr = SessionManager()
+        session_mgr = get_session_manager()
         if request.session_id:
             logger.info(f"[API] Using provided session_id: {request.session_id[:8]}...")
-            session = session_mgr.get_session(request.session_id)
-            if not session:
-                logger.info(f"[API] Session not found for provided session_id: {request.session_id[:8]}... Creating new session.")
-                session_mgr.create_session(request.session_id, str(request.user_id))
+            session = await session_mgr.get_or_create_session(request.session_id, str(request.user_id), persist=False)
         else:
             # Generate session_id if not provided
             request.session_id = str(uuid.uuid4())
-            session_mgr.create_session(request.session_id, str(request.user_id))
+            session = session_mgr.create_session(request.session_id, str(request.user_id))
             logger.info(f"[API] Generated new session_id: {request.session_id[:8]}...")
         
         # Detect if this is a follow-up query BEFORE adding current message
         logger.info(f"[API] Checking for follow-up query...")
-        session = session_mgr.get_session(request.session_id)
-        messages = session.get("messages", []) if session else []
-        previous_query = None
+        previous_query = session_mgr.get_last_user_query(session)
         is_followup = False
         followup_ref = None
         anchor_scope = None
         
-        # Look for the last user message in the existing conversation
-        if len(messages) >= 2:
-            # Find last user message (messages alternate: user, assistant, user, assistant...)
-            for i in range(len(messages) - 1, -1, -1):
-                if messages[i].get("role") == "user":
-                    previous_query = messages[i].get("content")
-                    logger.info(f"[API] Found previous query: '{previous_query[:50]}...'")
-                    break
+        if previous_query:
+            logger.info(f"[API] Found previous query: '{previous_query[:50]}...'")
+            router = get_query_router()
+            followup_detection = router.detect_followup(request.query, previous_query)
+            is_followup = followup_detection.get("is_followup", False)
+            confidence = followup_detection.get("confidence", 0.0)
+            logger.info(f"[API] Follow-up detection result | is_followup={is_followup} | confidence={confidence:.2f}")
             
-            if previous_query:
-                router = QueryRouter()
-                followup_detection = router.detect_followup(request.query, previous_query)
-                is_followup = followup_detection.get("is_followup", False)
-                confidence = followup_detection.get("confidence", 0.0)
-                logger.info(f"[API] Follow-up detection result | is_followup={is_followup} | confidence={confidence:.2f}")
+            if is_followup and confidence >= 0.6:
+                # Get the last query context for scope reference
+                context_count = session_mgr.query_context_count(session)
+                followup_ref = str(context_count - 1) if context_count else None
                 
-                if is_followup and confidence >= 0.6:
-                    # Get the last query context for scope reference
-                    contexts = session.get("query_contexts", []) if session else []
-                    followup_ref = str(len(contexts) - 1) if contexts else None
-                    
-                    # Build anchor_scope from prior query IDs
-                    if followup_ref is not None:
-                        anchor_scope = session_mgr.get_query_scope(request.session_id, int(followup_ref))
-                        if anchor_scope:
+                # Build anchor_scope from prior query IDs
+                if followup_ref is not None:
+                    anchor_scope = await session_mgr.get_query_scope(request.session_id, int(followup_ref), session=session)
+                    if anchor_scope:
+                        if logger.isEnabledFor(logging.INFO):
                             trade_ids_preview = anchor_scope.get("trade_ids", [])[:5]
                             journal_ids_preview = anchor_scope.get("journal_ids", [])[:5]
                             logger.info(f"[API] Anchor scope retrieved | trade_ids={len(anchor_scope.get('trade_ids', []))} {trade_ids_preview}... | journal_ids={len(anchor_scope.get('journal_ids', []))} {journal_ids_preview}...")
-                        else:
-                            logger.warning(f"[API] Could not retrieve anchor scope for followup_ref={followup_ref}")
+                    else:
+                        logger.warning(f"[API] Could not retrieve anchor scope for followup_ref={followup_ref}")
         
-        # Now add the current user message to session
-        session_mgr.add_message(request.session_id, "user", request.query)
+        # Stage the current user message; it is written together with the query context below
+        session = await session_mgr.add_message(request.session_id, "user", request.query, session=session, persist=False)
 
         logger.info(f"[API] is_followup={is_followup} | followup_ref={followup_ref}")
         
         # 1. Retrieve Data (pass anchor_scope for follow-ups)
         retriever_start = time.perf_counter()
         retriever = DataRetriever(user_id=request.user_id)
-        retrieved_data = retriever.retrieve_data(request.query, anchor_scope=anchor_scope)
+        try:
+            query_embedding = await embed_task
+        except Exception as e:
+            # Journal search embeds on demand if needed; trade-only queries never touch the embedding
+            logger.warning(f"[API] Query embedding failed, deferring to retriever | error={e}")
+            query_embedding = None
+        # Blocking SQL/Qdrant calls run in worker threads so the event loop keeps serving other requests.
+        # The past-conversation search for the prompt history doesn't depend on retrieval, so both run at once
+        retrieved_data, relevant_conversations = await asyncio.gather(
+            asyncio.to_thread(
+                retriever.retrieve_data,
+                request.query,
+                anchor_scope=anchor_scope,
+                query_embedding=query_embedding
+            ),
+            find_relevant_conversations(request.user_id, request.query, query_embedding)
+        )
         retriever_duration = (time.perf_counter() - retriever_start) * 1000
         
         trade_count = len(retrieved_data.get("trades", []))
@@ -143,111 +189,150 @@ async def chat_endpoint(request: ChatRequest):
         
         # 1.5 Store query context for future follow-ups (pass date_range from retriever)
         date_range = retriever.date_context[:2] if retriever.date_context else None
-        session_mgr.add_query_context(
+        session = await session_mgr.add_query_context(
             request.session_id,
             request.query,
             retrieved_data,
             is_followup=is_followup,
             followup_ref=anchor_scope,
-            date_range=date_range
+            date_range=date_range,
+            session=session,
+            persist=False
         )
+        # One background SETEX for the user message + query context, off the path to the first LLM token
+        session_write = session_mgr.save_session_in_background(request.session_id, session)
 
         # Check if query is in-domain (reject out-of-domain queries)
         logger.info(f"[API] Checking if query is in-domain...")
-        is_in_domain = (retriever.query_analysis or {}).get("is_in_domain", True)
+        query_analysis = retriever.query_analysis or {}
+        is_in_domain = query_analysis.get("is_in_domain", True)
+        query_type = query_analysis.get("query_type") or "unknown"
         if not is_in_domain:
-            logger.info(f"[API] OUT-OF-DOMAIN query rejected | query_type={(retriever.query_analysis or {}).get('query_type', 'unknown')}")
-            
-            if request.stream:
-                return StreamingResponse(
-                    generate_out_of_domain_response(OUT_OF_DOMAIN_RESPONSE, start_time, request_id),
-                    media_type="text/event-stream",
-                    headers={
-                        "Cache-Control": "no-cache",
-                        "Connection": "keep-alive",
-                        "X-Accel-Buffering": "no"
-                    }
-                )
-            else:
-                return ChatResponse(
-                    response=OUT_OF_DOMAIN_RESPONSE,
-                    data={},
-                    metadata={
-                        "request_id": request_id,
-                        "duration_ms": (time.perf_counter() - start_time) * 1000,
-                        "query_type": "out_of_domain",
-                        "status": "rejected"
-                    }
-                )
-        
-        # 3. Handle streaming vs non-streaming
-        if request.stream:
-            logger.info(f"[API] Starting SSE stream...")
+            logger.info(f"[API] OUT-OF-DOMAIN query rejected | query_type={query_type}")
+
+        return {
+            "session": session,
+            "retriever": retriever,
+            "retrieved_data": retrieved_data,
+            "retriever_duration": retriever_duration,
+            "is_followup": is_followup,
+            "anchor_scope": anchor_scope,
             # For follow-ups, use anchor IDs; otherwise no scope constraint
-            trade_scope_for_llm = anchor_scope.get("trade_ids", []) if (is_followup and anchor_scope) else None
-            return StreamingResponse(
-                generate_stream_response(
-                    request, 
-                    retriever, 
-                    retrieved_data, 
-                    start_time, 
-                    request_id,
-                    is_followup=is_followup,
-                    trade_scope=trade_scope_for_llm,
-                    anchor_scope=anchor_scope
-                ),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "X-Accel-Buffering": "no"  # Disable nginx buffering
+            "trade_scope": anchor_scope.get("trade_ids", []) if (is_followup and anchor_scope) else None,
+            "is_in_domain": is_in_domain,
+            "query_type": query_type,
+            "session_write": session_write,
+            "relevant_conversations": relevant_conversations,
+            "query_embedding": query_embedding,
+        }
+    finally:
+        # Don't leave the embedding running if the turn failed or the client went away
+        if not embed_task.done():
+            embed_task.cancel()
+
+# response_model documents the JSON shape; handlers return ready-made responses, so FastAPI skips re-validation
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Chat endpoint supporting both streaming and non-streaming responses.
+    Set request.stream=true for SSE streaming.
+    """
+    request_id = http_request.state.request_id
+    start_time = http_request.state.t0
+    
+    # Build log previews only when INFO is on; slice the query/session id once
+    if logger.isEnabledFor(logging.INFO):
+        query_preview = request.query[:60] + "..." if len(request.query) > 60 else request.query
+        sid_short = request.session_id[:8] + "..." if request.session_id else "none"
+        logger.info("[API] " + "="*60)
+        logger.info(f"[API] REQUEST START | id={request_id} | user={request.user_id} | stream={request.stream} | session_id={sid_short}")
+        logger.info(f"[API] Query: '{query_preview}'")
+
+    # Streaming: open the stream immediately and do retrieval inside the generator, so the
+    # client gets its first bytes without waiting for retrieval. The stream is recorded under its own
+    # unguessable token (request_id is short and logged), returned only to this client for resuming
+    if request.stream:
+        logger.info(f"[API] Starting SSE stream...")
+        stream_id = secrets.token_urlsafe(STREAM_ID_BYTES)
+        owner = {"user_id": request.user_id, "session_id": request.session_id}
+        return SSEResponse(
+            resumable_stream(
+                stream_id,
+                generate_chat_stream(request, partial(prepare_chat_turn, request), start_time, request_id, stream_id),
+                owner,
+                request_id
+            ),
+            headers={"X-Stream-Id": stream_id}
+        )
+
+    try:
+        turn = await prepare_chat_turn(request)
+        session = turn["session"]
+        retriever = turn["retriever"]
+        retrieved_data = turn["retrieved_data"]
+        retriever_duration = turn["retriever_duration"]
+        is_followup = turn["is_followup"]
+        anchor_scope = turn["anchor_scope"]
+
+        if not turn["is_in_domain"]:
+            return chat_json_response(
+                response=OUT_OF_DOMAIN_RESPONSE,
+                data={},
+                metadata={
+                    "request_id": request_id,
+                    "duration_ms": (time.perf_counter() - start_time) * 1000,
+                    "query_type": "out_of_domain",
+                    "status": "rejected"
                 }
             )
         
         # Non-streaming response (original behavior)
+        generator = get_response_generator()
         llm_start = time.perf_counter()
-        generator = ResponseGenerator()
-        
-        # Build context with session history
-        session = session_mgr.get_session(request.session_id) if request.session_id else None
-        history_text = build_history_text(session, request.user_id, request.query)
-        
-        # Build compact context summary
-        compact_context = build_compact_context(retrieved_data, is_followup, anchor_scope)
-        context_str = f"{history_text}{compact_context}"
-        
-        # Extract date context from retriever for prompt enrichment
-        date_period_context = None
-        if retriever.date_context:
-            _, _, date_context_str = retriever.date_context
-            date_period_context = date_context_str
         
-        current_date = retriever.current_date.strftime("%B %d, %Y")
-        
-        # For follow-ups, use anchor IDs; otherwise no scope constraint
-        trade_scope_for_llm = anchor_scope.get("trade_ids", []) if (is_followup and anchor_scope) else None
+        # Build context with session history and compact data summary
+        encoded_rows = encode_retrieved_rows(retrieved_data)
+        llm_context = build_llm_context(
+            request, retriever, retrieved_data, session, is_followup, anchor_scope,
+            encoded_rows=encoded_rows,
+            relevant_conversations=turn["relevant_conversations"]
+        )
         
-        response_text = generator.generate_response(
-            user_query=request.query,
-            context=context_str,
-            user_name=request.user_name,
-            current_date=current_date,
-            date_period_context=date_period_context,
-            is_followup=is_followup,
-            trade_scope=trade_scope_for_llm
+        # Follow-ups depend on conversation state, so only standalone queries use the response cache
+        response_cache = get_response_cache()
+        scope_key = None if is_followup else llm_response_scope(
+            request, encoded_rows, llm_context, session, turn["relevant_conversations"]
         )
+        response_text = response_cache.get(request.user_id, scope_key, request.query, turn["query_embedding"]) if scope_key else None
+        cached = response_text is not None
+        if not cached:
+            try:
+                response_text = await generator.generate_response(
+                    user_query=request.query,
+                    user_name=request.user_name,
+                    is_followup=is_followup,
+                    trade_scope=turn["trade_scope"],
+                    **llm_context
+                )
+            except LLMResponseError:
+                # Answer with the apology, but leave the cache alone so the next ask retries the LLM
+                response_text = LLM_FALLBACK_RESPONSE
+            else:
+                if scope_key:
+                    response_cache.put(request.user_id, scope_key, request.query, response_text, turn["query_embedding"])
         llm_duration = (time.perf_counter() - llm_start) * 1000
         
-        # Save assistant response to session
-        if request.session_id:
-            session_mgr.add_message(request.session_id, "assistant", response_text)
+        # Save assistant response to session once the user-turn write has landed, so it can't be overwritten
+        await await_session_write(turn["session_write"])
+        await get_session_manager().add_message(request.session_id, "assistant", response_text, session=session)
 
         total_duration = (time.perf_counter() - start_time) * 1000
         
         logger.info(f"[API] REQUEST COMPLETE | id={request_id} | retrieval={retriever_duration:.0f}ms | llm={llm_duration:.0f}ms | total={total_duration:.0f}ms")
         logger.info("[API] " + "="*60)
 
-        return ChatResponse(
+        # Serialize with orjson directly instead of FastAPI's jsonable_encoder pass over every trade row
+        return chat_json_response(
             response=response_text,
             data=retrieved_data,
             metadata={
@@ -256,7 +341,8 @@ async def chat_endpoint(request: ChatRequest):
                 "duration_ms": total_duration,
                 "retrieval_ms": retriever_duration,
                 "llm_ms": llm_duration,
-                "query_type": retriever.query_analysis.get("query_type") if retriever.query_analysis else "unknown"
+                "query_type": turn["query_type"],
+                "cached": cached
             }
         )
 
@@ -266,12 +352,39 @@ async def chat_endpoint(request: ChatRequest):
         logger.info("[API] " + "="*60)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/health")
-async def health():
-    logger.debug("Health check requested")
+@app.get("/chat/stream/{stream_id}")
+async def resume_chat_stream(
+    stream_id: str,
+    user_id: str,
+    session_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(default=None)
+):
+    """
+    Resume an SSE chat stream after a dropped connection. `stream_id` is the token from the original
+    response (X-Stream-Id header / `status` event); `user_id` (and `session_id`, if the chat request sent
+    one) must match that request. Replays the logged frames after the `Last-Event-ID` header (all if
+    absent), then follows the live stream to its end. Data pages are not replayed.
+    """
+    try:
+        after = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an integer")
+    owner = await get_stream_log().owner(stream_id)
+    # A stream owned by someone else is reported exactly like a missing one
+    if (
+        owner is None
+        or owner.get("user_id") != user_id
+        or (owner.get("session_id") is not None and owner["session_id"] != session_id)
+    ):
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+    logger.info(f"[API] Resuming SSE stream | stream={stream_id[:6]}... | user={user_id} | last_event_id={after}")
+    return SSEResponse(replay_stream(stream_id, after))
+
+@lru_cache(maxsize=1)
+def get_static_health_info() -> dict:
+    """The parts of /health that are fixed for the process lifetime; built on first use."""
     return {
         "status": "ok",
-        "timestamp": datetime.now().isoformat() + "Z",
         "environment": settings.environment,
         "debug": settings.debug,
         "python_version": platform.python_version(),
@@ -289,6 +402,11 @@ async def health():
         }
     }
 
+@app.get("/health")
+async def health():
+    logger.debug("Health check requested")
+    return {**get_static_health_info(), "timestamp": datetime.now().isoformat() + "Z"}
+
 @app.get("/")
 async def serve_test_client():
     """Serve the test client HTML page."""
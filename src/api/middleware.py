@@ -0,0 +1,19 @@
+import secrets
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that stamps each HTTP request with a short request_id and a start time.
+    Endpoints read them from request.state.request_id / request.state.t0.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            state["t0"] = time.perf_counter()
+            state["request_id"] = secrets.token_hex(4)
+        await self.app(scope, receive, send)
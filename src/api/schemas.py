@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Any
 
 class ChatRequest(BaseModel):
@@ -6,7 +6,9 @@ class ChatRequest(BaseModel):
     query: str
     user_name: str = "Trader"
     stream: bool = False  # Enable streaming response
-    session_id: Optional[str] = None  # Session ID for conversation history
+    # Session ID for conversation history; omitted on the first turn, the server then generates one
+    # and returns it (metadata.session_id / the SSE `start` event). Used in Redis keys, so kept to a safe charset
+    session_id: Optional[str] = Field(default=None, max_length=128, pattern=r"^[A-Za-z0-9_-]*$")
 
 class ChatResponse(BaseModel):
     response: str
@@ -15,5 +17,5 @@ class ChatResponse(BaseModel):
 
 class StreamEvent(BaseModel):
     """Server-Sent Event structure for streaming responses."""
-    event: str  # "start", "chunk", "data", "done", "error"
+    event: str  # "status", "start", "trades", "journals", "data_end", "chunk", "done", "error"
     data: Any
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+In-process semantic cache for LLM responses.
+Entries are namespaced by (user_id, scope_key), where scope_key fingerprints the retrieved data, the
+prompt date and the conversation history before the turn, so a cached answer is only reused for the same
+data and history. Within a namespace, a query matches on normalized text or on query-embedding cosine
+similarity.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.embeddings import normalize_text
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+RESPONSE_CACHE_NAMESPACES = 1024  # (user_id, scope_key) buckets kept (LRU)
+RESPONSE_CACHE_PER_SCOPE = 16  # Recent queries remembered per bucket
+RESPONSE_CACHE_TTL_S = 3600
+RESPONSE_SIMILARITY_THRESHOLD = 0.95
+
+def response_scope_key(encoded_rows: dict, *extra: str) -> str:
+    """Fingerprint of the retrieved rows (as encoded for the prompt) plus any other prompt inputs."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ("trades", "journals"):
+        digest.update(name.encode())
+        for row in encoded_rows.get(name, []):
+            digest.update(row)
+            digest.update(b"\x00")
+    for part in extra:
+        digest.update(b"\x01" + str(part).encode())
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    TTL cache of final LLM responses, looked up by exact normalized query or embedding similarity.
+    Thread-safe.
+    """
+    def __init__(
+        self,
+        max_namespaces: int = RESPONSE_CACHE_NAMESPACES,
+        per_scope: int = RESPONSE_CACHE_PER_SCOPE,
+        ttl: float = RESPONSE_CACHE_TTL_S,
+        threshold: float = RESPONSE_SIMILARITY_THRESHOLD
+    ):
+        self.max_namespaces = max_namespaces
+        self.per_scope = per_scope
+        self.ttl = ttl
+        self.threshold = threshold
+        # (user_id, scope_key) -> deque of (expires_at, normalized_query, unit_embedding, response)
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(embedding: Optional[List[float]]) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+    def get(self, user_id: str, scope_key: str, query: str, embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Return a cached response for this query and data scope, or None."""
+        now = time.monotonic()
+        namespace = (str(user_id), scope_key)
+        with self._lock:
+            bucket = self._buckets.get(namespace)
+            if not bucket:
+                return None
+            self._buckets.move_to_end(namespace)
+            live: Iterable[Tuple] = [entry for entry in bucket if entry[0] > now]
+
+        normalized = normalize_text(query)
+        for _, entry_query, _, response in live:
+            if entry_query == normalized:
+                logger.info(f"[RESPONSE_CACHE] Cache HIT (exact) | user_id={user_id}")
+                return response
+
+        query_vec = self._unit(embedding)
+        candidates = [entry for entry in live if entry[2] is not None]
+        if query_vec is None or not candidates:
+            return None
+        matrix = np.stack([entry[2] for entry in candidates])
+        if matrix.shape[1] != query_vec.shape[0]:
+            return None
+        sims = matrix @ query_vec
+        best = int(np.argmax(sims))
+        if sims[best] >= self.threshold:
+            logger.info(f"[RESPONSE_CACHE] Cache HIT (semantic) | user_id={user_id} | similarity={sims[best]:.3f}")
+            return candidates[best][3]
+        return None
+
+    def put(self, user_id: str, scope_key: str, query: str, response: str, embedding: Optional[List[float]] = None):
+        """Remember `response` for this query and data scope."""
+        entry = (time.monotonic() + self.ttl, normalize_text(query), self._unit(embedding), response)
+        namespace = (str(user_id), scope_key)
+        with self._lock:
+            bucket = self._buckets.get(namespace)
+            if bucket is None:
+                bucket = self._buckets[namespace] = deque(maxlen=self.per_scope)
+            bucket.append(entry)
+            self._buckets.move_to_end(namespace)
+            while len(self._buckets) > self.max_namespaces:
+                self._buckets.popitem(last=False)
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    """Shared process-wide ResponseCache."""
+    return ResponseCache()
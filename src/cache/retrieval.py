@@ -0,0 +1,63 @@
+"""
+In-process cache for retrieval results, keyed on (user_id, normalized query, date range).
+Only exact repeats hit: an entry carries the router's query analysis, and queries that are close in
+embedding space can still differ in symbol, side or filters, so similar queries never share one.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from src.embeddings import normalize_text
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRIEVAL_CACHE_SIZE = 2048  # Entries kept (LRU)
+RETRIEVAL_CACHE_TTL_S = 60  # Short TTL so new trades/journals show up quickly
+
+class RetrievalCache:
+    """
+    TTL + LRU cache of retrieval results (data plus the query analysis that produced it).
+    Thread-safe, since retrieval runs in worker threads.
+    """
+    def __init__(self, maxsize: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL_S):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, entry)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id: str, query: str, date_key: Optional[Tuple]) -> Tuple:
+        return (str(user_id), normalize_text(query), date_key)
+
+    def get(self, user_id: str, query: str, date_key: Optional[Tuple]) -> Optional[dict]:
+        """Return the cached entry for this exact (normalized) query and date range, or None."""
+        now = time.monotonic()
+        key = self._key(user_id, query, date_key)
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            expires_at, entry = hit
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        logger.info(f"[RETRIEVAL_CACHE] Cache HIT | user_id={user_id}")
+        return entry
+
+    def put(self, user_id: str, query: str, date_key: Optional[Tuple], entry: dict):
+        """Cache a retrieval result for this query and date range."""
+        key = self._key(user_id, query, date_key)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+@lru_cache(maxsize=1)
+def get_retrieval_cache() -> RetrievalCache:
+    """Shared process-wide RetrievalCache."""
+    return RetrievalCache()
@@ -1,110 +1,343 @@
+import asyncio
+import logging
 import time
 import redis
-import json
+import redis.asyncio
+import orjson
+import zlib
+from bisect import bisect_right
 from datetime import datetime
+from functools import lru_cache
+from itertools import accumulate
 from typing import List, Optional
 from tiktoken import get_encoding
 
 from src.config import settings
+from src.utils.clients import get_openrouter_client, get_openai_client
 from src.logger import get_logger
-from src.utils.json_encoder import PostgreSQLEncoder
+from src.utils.json_encoder import pg_default
 
 logger = get_logger(__name__)
-redis_client = redis.from_url(settings.redis_url)
+@lru_cache(maxsize=1)
+def get_redis() -> redis.asyncio.Redis:
+    """
+    Shared async Redis client: session I/O runs on the event loop without blocking it or needing worker threads.
+    Built on first use from the current settings; call get_redis.cache_clear() after changing settings.redis_url.
+    """
+    # Bounded pool that waits for a free connection under bursts instead of opening unbounded new ones;
+    # TCP keepalive + periodic health checks keep idle pooled connections usable behind NATs/load balancers
+    pool = redis.asyncio.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=64,
+        timeout=5,  # Seconds to wait for a free pooled connection
+        socket_keepalive=True,
+        health_check_interval=30,
+        socket_connect_timeout=2,
+        socket_timeout=5,
+    )
+    return redis.asyncio.Redis(connection_pool=pool)
+
+# Strong references to in-flight background session writes and summary jobs (the event loop only keeps weak ones)
+_background_writes: set = set()
+_summary_jobs: set = set()
+
+# Redis layout: scalar fields in the hash `session:{id}` (orjson-encoded values), messages and query contexts
+# as lists `session:{id}:messages` / `session:{id}:query_contexts`, so appends never rewrite the whole session
+SESSION_TTL_S = 86400
+SESSION_LIST_FIELDS = ("messages", "query_contexts")
+# Query contexts carry up to 500 ids each: keep a bounded history in Redis and load only the latest per request
+MAX_STORED_QUERY_CONTEXTS = 20
+LOADED_QUERY_CONTEXTS = 1
+# Larger query contexts (long id lists / messages) are stored zlib-compressed; id lists roughly halve
+QUERY_CONTEXT_COMPRESS_MIN_BYTES = 1024
+# Per-user marker in the hash `user_history`: b"1" once a conversation is stored in the vector DB, b"0" after a
+# search found none (users known to have none skip the conversation search). Users without a marker, e.g. with
+# conversations stored before markers existed, are searched and the outcome recorded
+USER_HISTORY_KEY = "user_history"
+# In-memory bookkeeping of what is already in Redis (never written): list lengths, layout, pending rewrites
+PERSISTED_STATE_FIELD = "_persisted"
+# Rolling summaries are generated off the request path and parked under `session:{id}:pending_summary`;
+# the next add_message applies it. Loaded into this (never written) field
+PENDING_SUMMARY_FIELD = "_pending_summary"
+TRANSIENT_FIELDS = (PERSISTED_STATE_FIELD, PENDING_SUMMARY_FIELD)
+SUMMARY_JOB_TIMEOUT_S = 300  # A job marked in progress for longer than this is assumed lost and rescheduled
 
 # Constants for context management
 SUMMARY_TRIGGER_MESSAGE_COUNT = 15  # Trigger summarization when messages exceed this
 RECENT_MESSAGES_TO_KEEP = 8  # Keep this many recent messages after summarization
 SUMMARY_TOKEN_BUDGET = 500  # Max tokens for summary
+MAX_STORED_MESSAGES = 20  # Hard cap on stored messages, even if summarization keeps failing
+TOKEN_COUNT_CACHE_SIZE = 1024  # Memoized token counts (repeated queries, summaries re-counted in logs)
 
 class SessionManager:
     def __init__(self):
-        self.redis = redis_client
         self.encoding = get_encoding("cl100k_base")
         self.model_provider = settings.model_provider
         self.max_context_window = settings.analysis_llm_context_window
+        self._cached_token_count = lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)(self._count_tokens)
+
+    def _count_tokens(self, content: str) -> int:
+        # encode_ordinary skips the special-token scan; chat text never needs special tokens
+        return len(self.encoding.encode_ordinary(content))
 
     def message_token_count(self, content: str) -> int:
-        """Estimate total token count for a list of messages."""
-        return len(self.encoding.encode(content))
+        """Token count for one message's content (memoized)."""
+        return self._cached_token_count(content)
         
     def total_token_count(self, messages: List[dict]) -> int:
         """Calculate total token count for messages."""
         return sum(msg.get("token_count", 0) for msg in messages)
     
     def trim_messages_to_fit_context(self, messages: List[dict], max_tokens: int) -> List[dict]:
-        """Trim messages to fit within the model's context window."""
-        total_tokens = 0
-        trimmed_messages = []
-        
-        for msg in reversed(messages):
-            msg_tokens = msg.get("token_count", 0)
-            if total_tokens + msg_tokens <= max_tokens:
-                trimmed_messages.insert(0, msg)
-                total_tokens += msg_tokens
-            else:
-                logger.info(f"Trimming message to fit context window. Dropping message with {msg_tokens} tokens.")
-                break
-        
-        return trimmed_messages
+        """Trim messages to fit within the model's context window (keeps the longest newest-first suffix that fits)."""
+        # Suffix token sums, newest first, never decrease: bisect finds how many recent messages fit
+        suffix_tokens = list(accumulate(msg.get("token_count", 0) for msg in reversed(messages)))
+        keep = bisect_right(suffix_tokens, max_tokens)
+        if keep < len(messages):
+            logger.info(f"Trimming messages to fit context window. Dropping {len(messages) - keep} oldest messages.")
+        return messages[len(messages) - keep:]
 
     @staticmethod
-    def create_session(session_id: str, user_id: str):
+    def create_session(session_id: str, user_id: str) -> dict:
+        """Build a new session dict; nothing is written until the first save."""
         logger.info(f"[SESSION] Creating new session | session_id={session_id[:8]}... | user_id={user_id}")
         session_data = {
             "user_id": user_id,
             "created_at": datetime.now().isoformat(),
             "messages": [],
-            "query_contexts": [],
+            "last_user_query": None,  # Scalar copy of the latest user message for follow-up detection
+            "query_contexts": [],  # Only the most recent contexts are loaded; see query_context_count
+            "query_context_count": 0,
             "model": settings.analysis_model,
             "total_token_count": 0,
             # Hybrid context management fields
             "conversation_summary": None,  # Rolling summary of older messages
             "summary_generated_at": None,
+            "summary_in_progress_at": None,  # Set while a background summary job is running
             "messages_summarized_count": 0
         }
+        return session_data
+
+    async def get_or_create_session(self, session_id: str, user_id: str, persist: bool = True) -> dict:
+        """Fetch the session once per request, creating it if missing; persist=False leaves the first write to the caller."""
+        session = await self.get_session(session_id)
+        if session is None:
+            logger.info(f"[SESSION] Session not found | session_id={session_id[:8]}... Creating new session.")
+            session = self.create_session(session_id, user_id)
+            if persist:
+                await self.save_session(session_id, session)  # Expires in 24 hours
+                logger.info(f"[SESSION] Session created and cached in Redis (TTL=24h)")
+        return session
+
+    @staticmethod
+    def _session_keys(session_id: str) -> tuple:
+        """Redis keys for the session hash and its messages / query_contexts lists."""
+        key = f"session:{session_id}"
+        return key, f"{key}:messages", f"{key}:query_contexts"
+
+    @staticmethod
+    def _pending_summary_key(session_id: str) -> str:
+        return f"session:{session_id}:pending_summary"
+
+    @staticmethod
+    def _mark_messages_rewritten(session_data: dict):
+        """Flag that the message list was replaced (summary/trim), so the next save rewrites it instead of appending."""
+        session_data.setdefault(PERSISTED_STATE_FIELD, {})["rewrite_messages"] = True
+
+    def _drop_oldest_messages(self, session_data: dict, count: int):
+        """Drop the `count` oldest messages, subtracting their tokens from the running total."""
+        messages = session_data["messages"]
+        session_data["total_token_count"] -= self.total_token_count(messages[:count])
+        session_data["messages"] = messages[count:]
+        self._mark_messages_rewritten(session_data)
+
+    @staticmethod
+    def _encode_query_context(ctx: dict) -> bytes:
+        encoded = orjson.dumps(ctx, default=pg_default)
+        if len(encoded) >= QUERY_CONTEXT_COMPRESS_MIN_BYTES:
+            return zlib.compress(encoded, 1)
+        return encoded
+
+    @staticmethod
+    def _decode_query_context(raw: bytes) -> dict:
+        # Plain entries are JSON objects; anything else is a compressed one
+        return orjson.loads(raw if raw[:1] == b"{" else zlib.decompress(raw))
+
+    @staticmethod
+    def _build_write(session_id: str, session_data: dict) -> tuple:
+        """
+        Encode the changes since the last save as (commands, payload_bytes), and mark them persisted.
+        Scalar fields are re-set (they are small); list items are only appended unless the list was rewritten.
+        Sessions not yet in the hash layout (new, or legacy JSON blobs) are written in full.
+        """
+        key, messages_key, contexts_key = SessionManager._session_keys(session_id)
+        state = session_data.get(PERSISTED_STATE_FIELD) or {}
+        full_write = state.get("layout") != "hash"
+
+        fields = {
+            name: orjson.dumps(value, default=pg_default)
+            for name, value in session_data.items()
+            if name not in SESSION_LIST_FIELDS and name not in TRANSIENT_FIELDS
+        }
+        commands = []
+        if full_write:
+            commands.append(("delete", (key, messages_key, contexts_key)))
+        if state.get("clear_pending_summary"):
+            commands.append(("delete", (SessionManager._pending_summary_key(session_id),)))
+        commands.append(("hset", (key,), {"mapping": fields}))
+        payload_bytes = sum(len(v) for v in fields.values())
 
-        redis_client.setex(f"session:{session_id}", 86400, json.dumps(session_data, cls=PostgreSQLEncoder))  # Expires in 24 hours
-        logger.info(f"[SESSION] Session created and cached in Redis (TTL=24h)")
+        for field, list_key in (("messages", messages_key), ("query_contexts", contexts_key)):
+            items = session_data.get(field) or []
+            rewrite = field == "messages" and state.get("rewrite_messages") and not full_write
+            if rewrite:
+                commands.append(("delete", (list_key,)))
+            start = 0 if (full_write or rewrite) else state.get(field, 0)
+            if field == "query_contexts":
+                encoded = [SessionManager._encode_query_context(item) for item in items[start:]]
+            else:
+                encoded = [orjson.dumps(item, default=pg_default) for item in items[start:]]
+            if encoded:
+                commands.append(("rpush", (list_key, *encoded)))
+                payload_bytes += sum(len(v) for v in encoded)
+        commands.append(("ltrim", (contexts_key, -MAX_STORED_QUERY_CONTEXTS, -1)))
+
+        for k in (key, messages_key, contexts_key):
+            commands.append(("expire", (k, SESSION_TTL_S)))
+
+        session_data[PERSISTED_STATE_FIELD] = {
+            "layout": "hash",
+            "messages": len(session_data.get("messages") or []),
+            "query_contexts": len(session_data.get("query_contexts") or []),
+        }
+        return commands, payload_bytes
 
     @staticmethod
-    def get_session(session_id: str) -> Optional[dict]:
+    async def _execute_write(commands: list):
+        """Apply write commands atomically in one MULTI/EXEC round trip."""
+        async with get_redis().pipeline(transaction=True) as pipe:
+            for command in commands:
+                name, args = command[0], command[1]
+                kwargs = command[2] if len(command) > 2 else {}
+                getattr(pipe, name)(*args, **kwargs)
+            await pipe.execute()
+
+    @staticmethod
+    def _rollback_persisted_state(session_data: dict, previous: Optional[dict]):
+        """
+        Undo _build_write's bookkeeping after a failed write. The write is one MULTI/EXEC, so nothing was applied:
+        the next save re-appends the same pending items (and redoes any pending rewrite) instead of falling back
+        to a full rewrite, which would only have the loaded tail of the query contexts and drop the rest.
+        """
+        if previous is None:
+            session_data.pop(PERSISTED_STATE_FIELD, None)
+        else:
+            session_data[PERSISTED_STATE_FIELD] = previous
+
+    @staticmethod
+    async def save_session(session_id: str, session_data: dict):
+        """Write the session's changes to Redis and refresh its 24h expiry."""
+        previous = session_data.get(PERSISTED_STATE_FIELD)
+        commands, _ = SessionManager._build_write(session_id, session_data)
+        try:
+            await SessionManager._execute_write(commands)
+        except Exception:
+            SessionManager._rollback_persisted_state(session_data, previous)
+            raise
+
+    @staticmethod
+    def save_session_in_background(session_id: str, session_data: dict) -> asyncio.Task:
+        """
+        Snapshot the session's changes now and write them in a separate task without blocking the caller.
+        Await the returned task before the next write to the same session.
+        """
+        # Encode on the caller's thread so later in-memory mutations can't leak into this write
+        previous = session_data.get(PERSISTED_STATE_FIELD)
+        commands, payload_bytes = SessionManager._build_write(session_id, session_data)
+
+        async def _write():
+            start = time.perf_counter()
+            try:
+                await SessionManager._execute_write(commands)
+            except Exception as e:
+                SessionManager._rollback_persisted_state(session_data, previous)
+                logger.error(f"[SESSION] Background write FAILED | session_id={session_id[:8]}... | error={e}")
+                raise
+            duration = (time.perf_counter() - start) * 1000
+            logger.info(f"[SESSION] Background write complete | session_id={session_id[:8]}... | bytes={payload_bytes} | time={duration:.2f}ms")
+
+        task = asyncio.create_task(_write())
+        _background_writes.add(task)
+        task.add_done_callback(_background_writes.discard)
+        return task
+
+    @staticmethod
+    def get_last_user_query(session: Optional[dict]) -> Optional[str]:
+        """Return the latest user message, scanning messages only for sessions created before last_user_query existed."""
+        if not session:
+            return None
+        if "last_user_query" in session:
+            return session["last_user_query"]
+        for msg in reversed(session.get("messages", [])):
+            if msg.get("role") == "user":
+                return msg.get("content")
+        return None
+
+    @staticmethod
+    async def get_session(session_id: str) -> Optional[dict]:
         start = time.perf_counter()
-        session_raw = redis_client.get(f"session:{session_id}")
+        key, messages_key, contexts_key = SessionManager._session_keys(session_id)
+        async with get_redis().pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            pipe.lrange(messages_key, 0, -1)
+            pipe.lrange(contexts_key, -LOADED_QUERY_CONTEXTS, -1)
+            pipe.get(SessionManager._pending_summary_key(session_id))
+            fields, messages, contexts, pending_summary = await pipe.execute(raise_on_error=False)
+
+        if isinstance(fields, redis.ResponseError):
+            # Legacy single JSON blob under `session:{id}`; rewritten in the hash layout on the next save
+            session_raw = await get_redis().get(key)
+            parsed = orjson.loads(session_raw) if session_raw else None
+            if parsed:
+                parsed.setdefault("query_context_count", len(parsed.get("query_contexts", [])))
+        elif fields:
+            # orjson accepts the raw bytes from Redis without a separate decode step
+            parsed = {name.decode(): orjson.loads(value) for name, value in fields.items()}
+            parsed["messages"] = [orjson.loads(m) for m in messages]
+            parsed["query_contexts"] = [SessionManager._decode_query_context(c) for c in contexts]
+            parsed[PERSISTED_STATE_FIELD] = {
+                "layout": "hash",
+                "messages": len(messages),
+                "query_contexts": len(contexts),
+            }
+            if pending_summary:
+                parsed[PENDING_SUMMARY_FIELD] = orjson.loads(pending_summary)
+        else:
+            parsed = None
         duration = (time.perf_counter() - start) * 1000
         
-        if not session_raw:
+        if not parsed:
             logger.info(f"[SESSION] Cache MISS | session_id={session_id[:8]}... | lookup={duration:.2f}ms")
             return None
-        
-        # Handle bytes from Redis
-        if isinstance(session_raw, bytes):
-            parsed = json.loads(session_raw.decode('utf-8'))
-        else:
-            parsed = json.loads(str(session_raw))
             
         msg_count = len(parsed.get("messages", []))
         token_count = parsed.get("total_token_count", 0)
         logger.info(f"[SESSION] Cache HIT | session_id={session_id[:8]}... | messages={msg_count} | tokens={token_count} | lookup={duration:.2f}ms")
         return parsed
     
-    def add_message(self, session_id: str, role: str, content: str):
+    async def add_message(self, session_id: str, role: str, content: str, session: Optional[dict] = None, persist: bool = True) -> Optional[dict]:
+        """
+        Append a message and return the updated session.
+        Pass the already-loaded session to skip the Redis read; persist=False defers the write to a later call.
+        """
         start = time.perf_counter()
-        key = f"session:{session_id}"
-        session_raw = redis_client.get(key)
-        
-        # Handle bytes or None from Redis
-        if session_raw is None:
-            session_data = {}
-        elif isinstance(session_raw, bytes):
-            session_data = json.loads(session_raw.decode('utf-8'))
-        else:
-            session_data = json.loads(str(session_raw))
+        session_data = session if session is not None else (await self.get_session(session_id) or {})
         
         if session_data:
             msg_tokens = self.message_token_count(content)
-            content_preview = content[:40] + "..." if len(content) > 40 else content
-            logger.info(f"[SESSION] Adding message | session_id={session_id[:8]}... | role={role} | tokens={msg_tokens} | content='{content_preview}'")
+            if logger.isEnabledFor(logging.INFO):
+                content_preview = content[:40] + "..." if len(content) > 40 else content
+                logger.info(f"[SESSION] Adding message | session_id={session_id[:8]}... | role={role} | tokens={msg_tokens} | content='{content_preview}'")
             
             session_data["messages"].append({
                 "role": role,
@@ -112,81 +345,121 @@ class SessionManager:
                 "timestamp": datetime.now().isoformat(),
                 "token_count": msg_tokens
             })
-            session_data["total_token_count"] = self.total_token_count(session_data["messages"])
+            # Running total, adjusted incrementally here and when old messages are summarized, capped or trimmed
+            if "total_token_count" in session_data:
+                session_data["total_token_count"] += msg_tokens
+            else:
+                session_data["total_token_count"] = self.total_token_count(session_data["messages"])
+            if role == "user":
+                session_data["last_user_query"] = content
             
-            # Check if we need to generate a rolling summary
+            # Install a summary finished by a background job, then start a new job if still over the threshold
+            if session_data.get(PENDING_SUMMARY_FIELD):
+                self._apply_pending_summary(session_id, session_data)
             message_count = len(session_data["messages"])
             if message_count > SUMMARY_TRIGGER_MESSAGE_COUNT:
-                logger.info(f"[SESSION] Triggering rolling summary | messages={message_count} > threshold={SUMMARY_TRIGGER_MESSAGE_COUNT}")
-                session_data = self._generate_and_apply_summary(session_id, session_data)
+                self._schedule_summary(session_id, session_data)
+            
+            # Until a summary lands (or if it keeps failing), cap the list so history/prompt cost stays bounded
+            if len(session_data["messages"]) > MAX_STORED_MESSAGES:
+                self._drop_oldest_messages(session_data, len(session_data["messages"]) - MAX_STORED_MESSAGES)
+                logger.warning(f"[SESSION] Message cap reached | session_id={session_id[:8]}... | kept={MAX_STORED_MESSAGES}")
             
             # Fallback: Hard trim if still over token limit
             max_tokens = self.max_context_window
             if session_data["total_token_count"] > max_tokens:
                 old_count = len(session_data["messages"])
                 logger.warning(f"[SESSION] Context overflow after summary | tokens={session_data['total_token_count']}/{max_tokens} | Trimming...")
-                session_data["messages"] = self.trim_messages_to_fit_context(session_data["messages"], max_tokens)
-                session_data["total_token_count"] = self.total_token_count(session_data["messages"])
+                kept = self.trim_messages_to_fit_context(session_data["messages"], max_tokens)
+                self._drop_oldest_messages(session_data, old_count - len(kept))
                 new_count = len(session_data["messages"])
                 logger.info(f"[SESSION] Trimmed {old_count - new_count} messages | new_tokens={session_data['total_token_count']}")
 
-            redis_client.setex(key, 86400, json.dumps(session_data, cls=PostgreSQLEncoder))  # Refresh expiry
+            if settings.debug:
+                expected = self.total_token_count(session_data["messages"])
+                if session_data["total_token_count"] != expected:
+                    logger.warning(f"[SESSION] Token count drift | session_id={session_id[:8]}... | running={session_data['total_token_count']} | actual={expected}")
+                    session_data["total_token_count"] = expected
+
+            if persist:
+                await self.save_session(session_id, session_data)  # Refresh expiry
             duration = (time.perf_counter() - start) * 1000
-            logger.info(f"[SESSION] Message saved | total_messages={len(session_data['messages'])} | total_tokens={session_data['total_token_count']} | has_summary={session_data.get('conversation_summary') is not None} | save_time={duration:.2f}ms")
+            logger.info(f"[SESSION] Message {'saved' if persist else 'staged'} | total_messages={len(session_data['messages'])} | total_tokens={session_data['total_token_count']} | has_summary={session_data.get('conversation_summary') is not None} | save_time={duration:.2f}ms")
+            return session_data
         else:
             logger.error(f"[SESSION] Failed to add message - session not found | session_id={session_id[:8]}...")
+            return None
     
-    def _generate_and_apply_summary(self, session_id: str, session_data: dict) -> dict:
+    @staticmethod
+    def _summary_in_progress(session_data: dict) -> bool:
+        started = session_data.get("summary_in_progress_at")
+        if not started:
+            return False
+        return (datetime.now() - datetime.fromisoformat(started)).total_seconds() < SUMMARY_JOB_TIMEOUT_S
+
+    def _schedule_summary(self, session_id: str, session_data: dict):
         """
-        Generate a rolling summary of older messages and keep only recent ones.
-        Uses LLM to compress conversation context while preserving key information.
+        Start a background job summarizing all but the most recent messages, unless one is already running.
+        The request carries on with the messages as they are; the summary is applied on a later add_message.
         """
         messages = session_data.get("messages", [])
-        if len(messages) <= RECENT_MESSAGES_TO_KEEP:
-            return session_data
-        
-        # Split messages: old ones to summarize, recent ones to keep
+        if len(messages) <= RECENT_MESSAGES_TO_KEEP or self._summary_in_progress(session_data):
+            return
         messages_to_summarize = messages[:-RECENT_MESSAGES_TO_KEEP]
-        recent_messages = messages[-RECENT_MESSAGES_TO_KEEP:]
-        
-        old_summary = session_data.get("conversation_summary", "")
-        
+        old_summary = session_data.get("conversation_summary") or ""
+        session_data["summary_in_progress_at"] = datetime.now().isoformat()
+        logger.info(f"[SESSION] Scheduling rolling summary | session_id={session_id[:8]}... | messages={len(messages)} > threshold={SUMMARY_TRIGGER_MESSAGE_COUNT}")
+
+        task = asyncio.create_task(self._summarize_in_background(session_id, messages_to_summarize, old_summary))
+        _summary_jobs.add(task)
+        task.add_done_callback(_summary_jobs.discard)
+
+    async def _summarize_in_background(self, session_id: str, messages_to_summarize: List[dict], old_summary: str):
+        """
+        Generate a rolling summary and park it in Redis for the next add_message to apply.
+        Uses LLM to compress conversation context while preserving key information. Never raises.
+        """
+        summary_start = time.perf_counter()
         try:
-            summary_start = time.perf_counter()
-            
-            # Build conversation text for summarization
-            conversation_text = ""
-            if old_summary:
-                conversation_text += f"Previous Summary:\n{old_summary}\n\n"
-            
-            conversation_text += "New Messages to Incorporate:\n"
-            for msg in messages_to_summarize:
-                conversation_text += f"{msg['role'].upper()}: {msg['content']}\n"
-            
-            # Generate summary using LLM
-            new_summary = self._call_summary_llm(conversation_text)
-            
-            if new_summary:
-                # Apply summary to session
-                prev_summarized = session_data.get("messages_summarized_count", 0)
-                session_data["conversation_summary"] = new_summary
-                session_data["summary_generated_at"] = datetime.now().isoformat()
-                session_data["messages_summarized_count"] = prev_summarized + len(messages_to_summarize)
-                session_data["messages"] = recent_messages
-                session_data["total_token_count"] = self.total_token_count(recent_messages)
-                
-                summary_duration = (time.perf_counter() - summary_start) * 1000
-                logger.info(f"[SESSION] Rolling summary generated | session_id={session_id[:8]}... | summarized={len(messages_to_summarize)} messages | kept={len(recent_messages)} recent | summary_tokens={self.message_token_count(new_summary)} | time={summary_duration:.0f}ms")
-            else:
+            # Build conversation text for summarization in one join
+            conversation_text = (
+                (f"Previous Summary:\n{old_summary}\n\n" if old_summary else "")
+                + "New Messages to Incorporate:\n"
+                + "".join(f"{msg['role'].upper()}: {msg['content']}\n" for msg in messages_to_summarize)
+            )
+            # The summary LLM call uses the sync client; keep it off the event loop
+            new_summary = await asyncio.to_thread(self._call_summary_llm, conversation_text)
+            if not new_summary:
                 logger.warning(f"[SESSION] Summary generation returned empty, keeping messages as-is")
-                
+                return
+
+            pending = {
+                "summary": new_summary,
+                "generated_at": datetime.now().isoformat(),
+                # Summarized messages are a prefix of the list: identify its end by the last one's timestamp
+                "through": messages_to_summarize[-1].get("timestamp"),
+                "count": len(messages_to_summarize),
+            }
+            await get_redis().set(self._pending_summary_key(session_id), orjson.dumps(pending), ex=SESSION_TTL_S)
+            summary_duration = (time.perf_counter() - summary_start) * 1000
+            logger.info(f"[SESSION] Rolling summary generated | session_id={session_id[:8]}... | summarized={len(messages_to_summarize)} messages | summary_tokens={self.message_token_count(new_summary)} | time={summary_duration:.0f}ms")
         except Exception as e:
             logger.error(f"[SESSION] Summary generation failed | session_id={session_id[:8]}... | error={e}")
-            # On failure, just trim messages to avoid bloat
-            session_data["messages"] = recent_messages
-            session_data["total_token_count"] = self.total_token_count(recent_messages)
-        
-        return session_data
+
+    def _apply_pending_summary(self, session_id: str, session_data: dict):
+        """Install a background-generated summary and drop the messages it covers."""
+        pending = session_data.pop(PENDING_SUMMARY_FIELD)
+        messages = session_data.get("messages", [])
+        # Messages up to and including `through`; if it was already capped away, so were all the others
+        cut = next((i + 1 for i, msg in enumerate(messages) if msg.get("timestamp") == pending.get("through")), 0)
+
+        session_data["conversation_summary"] = pending["summary"]
+        session_data["summary_generated_at"] = pending["generated_at"]
+        session_data["summary_in_progress_at"] = None
+        session_data["messages_summarized_count"] = session_data.get("messages_summarized_count", 0) + pending.get("count", cut)
+        self._drop_oldest_messages(session_data, cut)
+        session_data[PERSISTED_STATE_FIELD]["clear_pending_summary"] = True
+        logger.info(f"[SESSION] Rolling summary applied | session_id={session_id[:8]}... | dropped={cut} messages | kept={len(session_data['messages'])} recent")
     
     def _call_summary_llm(self, conversation_text: str) -> Optional[str]:
         """
@@ -194,8 +467,6 @@ class SessionManager:
         Uses a lightweight prompt to keep costs low.
         """
         try:
-            from src.utils.clients import get_openrouter_client, get_openai_client
-            
             summary_prompt = f"""Summarize this trading assistant conversation concisely (2-4 sentences).
 Focus on: key trading topics discussed, specific trades/symbols mentioned, decisions or insights shared, and any ongoing analysis context.
 Keep it factual and useful for continuing the conversation.
@@ -229,27 +500,24 @@ Summary:"""
             logger.error(f"[SESSION] LLM summary call failed | error={e}")
             return None
     
-    def add_query_context(self, session_id: str, user_message: str, retrieved_data: dict, is_followup: bool = False, followup_ref: Optional[dict] = None, date_range: Optional[tuple] = None):
-        """Store only identifiers and minimal metadata for a query to support follow-ups."""
+    async def add_query_context(self, session_id: str, user_message: str, retrieved_data: dict, is_followup: bool = False, followup_ref: Optional[dict] = None, date_range: Optional[tuple] = None, session: Optional[dict] = None, persist: bool = True) -> Optional[dict]:
+        """
+        Store only identifiers and minimal metadata for a query to support follow-ups. Returns the updated session.
+        persist=False leaves the write to the caller (e.g. save_session_in_background).
+        """
         start = time.perf_counter()
-        key = f"session:{session_id}"
-        session_raw = redis_client.get(key)
+        session_data = session if session is not None else await self.get_session(session_id)
         
-        if session_raw is None:
+        if not session_data:
             logger.warning(f"[SESSION] Cannot add query context - session not found | session_id={session_id[:8]}...")
-            return
-        
-        if isinstance(session_raw, bytes):
-            session_data = json.loads(session_raw.decode('utf-8'))
-        else:
-            session_data = json.loads(str(session_raw))
+            return None
         
         if "query_contexts" not in session_data:
             session_data["query_contexts"] = []
 
         logger.info(f"[SESSION] Adding query context | session_id={session_id[:8]}... | is_followup={is_followup}")
         
-        query_index = len(session_data.get("query_contexts", []))
+        query_index = self.query_context_count(session_data)
         
         # Extract IDs only (no raw data)
         trade_ids = [t.get("trade_id") for t in retrieved_data.get("trades", []) if t.get("trade_id")]
@@ -295,56 +563,118 @@ Summary:"""
             }
         
         session_data["query_contexts"].append(query_context)
-        redis_client.setex(key, 86400, json.dumps(session_data, cls=PostgreSQLEncoder))
+        session_data["query_context_count"] = query_index + 1
+        if persist:
+            await self.save_session(session_id, session_data)
         
         duration = (time.perf_counter() - start) * 1000
-        trade_preview = f"{trade_ids[:5]}..." if len(trade_ids) > 5 else str(trade_ids)
-        journal_preview = f"{journal_ids[:5]}..." if len(journal_ids) > 5 else str(journal_ids)
-        logger.info(f"[SESSION] Query context stored | query_index={query_index} | is_followup={is_followup} | trades={len(trade_ids)} {trade_preview} | journals={len(journal_ids)} {journal_preview} | truncated={truncated} | time={duration:.2f}ms")
+        if logger.isEnabledFor(logging.INFO):
+            trade_preview = f"{trade_ids[:5]}..." if len(trade_ids) > 5 else str(trade_ids)
+            journal_preview = f"{journal_ids[:5]}..." if len(journal_ids) > 5 else str(journal_ids)
+            logger.info(f"[SESSION] Query context stored | query_index={query_index} | is_followup={is_followup} | trades={len(trade_ids)} {trade_preview} | journals={len(journal_ids)} {journal_preview} | truncated={truncated} | time={duration:.2f}ms")
+        return session_data
     
     @staticmethod
-    def get_query_scope(session_id: str, query_index: int) -> Optional[dict]:
+    async def user_has_history(user_id: str) -> Optional[bool]:
+        """Whether this user has conversations stored in the vector DB; None if not recorded yet."""
+        marker = await get_redis().hget(USER_HISTORY_KEY, str(user_id))
+        return None if marker is None else marker == b"1"
+
+    @staticmethod
+    async def mark_user_history(user_id: str):
+        """Record that this user now has a stored conversation."""
+        await get_redis().hset(USER_HISTORY_KEY, str(user_id), b"1")
+
+    @staticmethod
+    async def mark_user_without_history(user_id: str):
+        """Record that a search found no stored conversations (never overrides a recorded conversation)."""
+        await get_redis().hsetnx(USER_HISTORY_KEY, str(user_id), b"0")
+
+    @staticmethod
+    def query_context_count(session: Optional[dict]) -> int:
+        """Number of query contexts ever stored for the session (only the latest are loaded in memory)."""
+        if not session:
+            return 0
+        if "query_context_count" in session:
+            return session["query_context_count"]
+        return len(session.get("query_contexts", []))  # Sessions created before the counter existed
+
+    @staticmethod
+    async def _find_query_context(session_id: str, session_data: dict, query_index: int) -> Optional[dict]:
+        """
+        The stored query context with this index. Contexts are appended in index order and only the newest
+        are kept (and loaded), so its position follows from the total count instead of a scan.
+        """
+        query_contexts = session_data.get("query_contexts", [])
+        from_end = SessionManager.query_context_count(session_data) - query_index  # 1 = newest
+        if 1 <= from_end <= len(query_contexts):
+            ctx = query_contexts[-from_end]
+            if ctx.get("query_index") == query_index:
+                return ctx
+        if from_end >= 1 and (session_data.get(PERSISTED_STATE_FIELD) or {}).get("layout") == "hash":
+            # Older than the loaded tail: fetch only that entry from the stored (bounded) list
+            _, _, contexts_key = SessionManager._session_keys(session_id)
+            raw = await get_redis().lindex(contexts_key, -from_end)
+            if raw is not None:
+                ctx = SessionManager._decode_query_context(raw)
+                if ctx.get("query_index") == query_index:
+                    return ctx
+                query_contexts = [SessionManager._decode_query_context(c) for c in await get_redis().lrange(contexts_key, 0, -1)]
+        # Positions don't line up (legacy contexts, or unsaved ones in memory): scan
+        return next((ctx for ctx in query_contexts if ctx.get("query_index") == query_index), None)
+
+    @staticmethod
+    async def get_query_scope(session_id: str, query_index: int, session: Optional[dict] = None) -> Optional[dict]:
         """Retrieve the scope (trade_ids, journal_ids, etc.) for a specific query to constrain follow-ups."""
-        session_raw = redis_client.get(f"session:{session_id}")
+        session_data = session if session is not None else await SessionManager.get_session(session_id)
         
-        if not session_raw:
+        if not session_data:
             return None
         
-        if isinstance(session_raw, bytes):
-            session_data = json.loads(session_raw.decode('utf-8'))
-        else:
-            session_data = json.loads(str(session_raw))
+        ctx = await SessionManager._find_query_context(session_id, session_data, query_index)
+        if ctx is None:
+            return None
         
-        query_contexts = session_data.get("query_contexts", [])
-        for ctx in query_contexts:
-            if ctx.get("query_index") == query_index:
-                # Backward compatibility: migrate legacy contexts with full data
-                trade_ids = ctx.get("trade_ids")
-                journal_ids = ctx.get("journal_ids")
-                
-                # Extract IDs from legacy trade_entries/journal_entries if needed
-                if trade_ids is None and "trade_entries" in ctx:
-                    trade_ids = [t.get("trade_id") for t in ctx.get("trade_entries", []) if t.get("trade_id")]
-                    logger.warning(f"[SESSION] Legacy context detected (query_index={query_index}) - extracted {len(trade_ids)} trade_ids from trade_entries")
-                
-                if journal_ids is None and "journal_entries" in ctx:
-                    journal_ids = [j.get("id") for j in ctx.get("journal_entries", []) if j.get("id")]
-                    logger.warning(f"[SESSION] Legacy context detected (query_index={query_index}) - extracted {len(journal_ids)} journal_ids from journal_entries")
-                
-                scope = {
-                    "trade_ids": trade_ids or [],
-                    "trade_count": ctx.get("trade_count", len(trade_ids or [])),
-                    "journal_ids": journal_ids or [],
-                    "journal_count": ctx.get("journal_count", len(journal_ids or [])),
-                    "truncated": ctx.get("truncated", False),
-                    "original_trade_count": ctx.get("original_trade_count"),
-                    "original_journal_count": ctx.get("original_journal_count")
-                }
-                
-                # Include date_range if available
-                if "date_range" in ctx:
-                    scope["date_range"] = ctx["date_range"]
-                
-                return scope
+        # Backward compatibility: migrate legacy contexts with full data
+        trade_ids = ctx.get("trade_ids")
+        journal_ids = ctx.get("journal_ids")
         
-        return None
+        # Extract IDs from legacy trade_entries/journal_entries if needed
+        if trade_ids is None and "trade_entries" in ctx:
+            trade_ids = [t.get("trade_id") for t in ctx.get("trade_entries", []) if t.get("trade_id")]
+            logger.warning(f"[SESSION] Legacy context detected (query_index={query_index}) - extracted {len(trade_ids)} trade_ids from trade_entries")
+        
+        if journal_ids is None and "journal_entries" in ctx:
+            journal_ids = [j.get("id") for j in ctx.get("journal_entries", []) if j.get("id")]
+            logger.warning(f"[SESSION] Legacy context detected (query_index={query_index}) - extracted {len(journal_ids)} journal_ids from journal_entries")
+        
+        scope = {
+            "trade_ids": trade_ids or [],
+            "trade_count": ctx.get("trade_count", len(trade_ids or [])),
+            "journal_ids": journal_ids or [],
+            "journal_count": ctx.get("journal_count", len(journal_ids or [])),
+            "truncated": ctx.get("truncated", False),
+            "original_trade_count": ctx.get("original_trade_count"),
+            "original_journal_count": ctx.get("original_journal_count")
+        }
+        
+        # Include date_range if available
+        if "date_range" in ctx:
+            scope["date_range"] = ctx["date_range"]
+        
+        return scope
+
+@lru_cache(maxsize=1)
+def get_session_manager() -> SessionManager:
+    """Shared SessionManager so the tokenizer and Redis client are reused across requests."""
+    return SessionManager()
+
+async def close_redis_client() -> None:
+    """Close the shared async Redis client's connection pool."""
+    if get_redis.cache_info().currsize == 0:
+        return
+    client = get_redis()
+    await client.aclose()
+    await client.connection_pool.disconnect()
+    get_redis.cache_clear()
+    logger.info("Closed session Redis client")
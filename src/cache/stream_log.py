@@ -0,0 +1,69 @@
+"""
+Redis-backed log of the SSE frames sent for each streamed chat response.
+Every resumable frame (everything but the bulk data pages) is appended to the list `sse:{stream_id}`; its
+index doubles as the SSE event id, so a client that drops mid-stream can reconnect with Last-Event-ID and
+replay the rest without re-running the LLM.
+The stream_id is an unguessable token handed only to the requesting client, and `sse:{stream_id}:owner`
+records the user/session the stream belongs to so a reconnect can be checked against it.
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import orjson
+
+from src.cache.session import get_redis
+
+STREAM_LOG_TTL_S = 300  # Reconnect window; refreshed on every append
+
+class StreamLog:
+    """Append-only frame log per stream_id, on the shared async Redis client unless one is given."""
+    def __init__(self, client=None, ttl: int = STREAM_LOG_TTL_S):
+        self._client = client
+        self.ttl = ttl
+
+    @property
+    def redis(self):
+        return self._client or get_redis()
+
+    @staticmethod
+    def _key(stream_id: str) -> str:
+        return f"sse:{stream_id}"
+
+    @staticmethod
+    def _owner_key(stream_id: str) -> str:
+        return f"sse:{stream_id}:owner"
+
+    async def append(self, stream_id: str, frames: List[bytes], owner: Optional[dict] = None):
+        """
+        Append frames in order and refresh the log's expiry (one round trip).
+        `owner` is stored alongside on the first write; later writes only refresh its expiry.
+        """
+        key = self._key(stream_id)
+        owner_key = self._owner_key(stream_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, *frames)
+            pipe.expire(key, self.ttl)
+            if owner is not None:
+                pipe.set(owner_key, orjson.dumps(owner), ex=self.ttl)
+            else:
+                pipe.expire(owner_key, self.ttl)
+            await pipe.execute()
+
+    async def read_from(self, stream_id: str, start: int) -> Tuple[List[bytes], Optional[bytes]]:
+        """Frames from index `start` onwards, plus the log's current last frame (None if the log is gone)."""
+        key = self._key(stream_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, start, -1)
+            pipe.lindex(key, -1)
+            frames, last = await pipe.execute()
+        return frames, last
+
+    async def owner(self, stream_id: str) -> Optional[dict]:
+        """The {"user_id", "session_id"} a stream was recorded for (None if unknown or expired)."""
+        raw = await self.redis.get(self._owner_key(stream_id))
+        return orjson.loads(raw) if raw else None
+
+@lru_cache(maxsize=1)
+def get_stream_log() -> StreamLog:
+    """Shared process-wide StreamLog."""
+    return StreamLog()
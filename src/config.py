@@ -31,6 +31,7 @@ class Settings(BaseSettings):
 
     # QDrant
     qdrant_url: str = "http://localhost:6333"
+    qdrant_prefer_grpc: bool = False  # gRPC on port 6334: one multiplexed keep-alive connection
 
     # Providers / Keys
     openai_api_key: str | None = None
@@ -48,6 +49,10 @@ class Settings(BaseSettings):
     # Embedding config
     embedding_dimension: int = 384  # 384 for MiniLM, 768 for MPNet, 1536 for OpenAI
     embedding_device: str = "cpu"  # "cpu" or "cuda" for GPU acceleration
+    embedding_backend: str = "torch"  # "torch", "onnx" (ONNX Runtime) or "openvino"
+    embedding_precision: str = "auto"  # torch backend: "auto" (fp16 on cuda, fp32 on cpu), "fp32", "fp16", "bf16" or "int8" (cpu)
+    embedding_hash_algo: str = "blake2b"  # Embedding cache key hash: "blake2b" or "sha256" (changing it re-keys the cache)
+    embedding_hash_migrate: bool = False  # Temporarily enable after switching algorithms: misses also check (and copy forward) SHA-256 keys
 
     # Rate limiting (simple config only; actual limiter integrated later)
     rate_limit_requests_per_minute: int = 60
@@ -8,8 +8,10 @@ Usage:
     python -m src.seed_journals
 """
 
-import json
 from pathlib import Path
+
+import orjson
+
 from src.vector_db.vector_store import JournalStore
 from src.logger import get_logger
 
@@ -17,6 +19,8 @@ logger = get_logger(__name__)
 
 # Journal file path
 JOURNALS_FILE_PATH = Path("sample_data/sample_journals.jsonl")
+# Entries embedded and upserted per batch (one model call and one Qdrant request each)
+SEED_BATCH_SIZE = 64
 
 
 def seed_journals():
@@ -35,32 +39,43 @@ def seed_journals():
     logger.info("Starting journal seeding process...")
     
     try:
-        with open(JOURNALS_FILE_PATH, "r", encoding="utf-8") as f:
+        with open(JOURNALS_FILE_PATH, "rb") as f:
             count = 0
             errors = 0
+            batch = []
+
+            def flush():
+                nonlocal count, errors
+                try:
+                    journal_store.upsert_journals(batch)
+                    count += len(batch)
+                    logger.info(f"Indexed {count} entries...")
+                except Exception as e:
+                    errors += len(batch)
+                    logger.error(f"Error upserting batch of {len(batch)} entries: {e}")
+                batch.clear()
             
             for line in f:
+                if not line.strip():
+                    continue
                 try:
-                    entry = json.loads(line.strip())
-                    journal_store.upsert_journal(
-                        user_id=entry["user_id"],
-                        text=entry["text"],
-                        tags=entry.get("tags", []),
-                        created_at=entry["created_at"]
-                    )
-                    count += 1
-                    
-                    if count % 10 == 0:
-                        logger.info(f"Indexed {count} entries...")
-                    else:
-                        logger.debug(f"Indexed: {entry['text'][:50]}...")
-                        
-                except json.JSONDecodeError as e:
+                    entry = orjson.loads(line)
+                    batch.append({
+                        "user_id": entry["user_id"],
+                        "text": entry["text"],
+                        "tags": entry.get("tags", []),
+                        "created_at": entry["created_at"]
+                    })
+                except orjson.JSONDecodeError as e:
                     errors += 1
                     logger.error(f"JSON parse error: {e}")
-                except Exception as e:
+                except KeyError as e:
                     errors += 1
-                    logger.error(f"Error upserting entry: {e}")
+                    logger.error(f"Journal entry missing field {e}")
+                if len(batch) >= SEED_BATCH_SIZE:
+                    flush()
+            if batch:
+                flush()
             
             logger.info("=" * 50)
             logger.info(f"Successfully indexed {count} journal entries")
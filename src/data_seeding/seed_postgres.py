@@ -38,8 +38,8 @@ def read_sql_file(file_path: Path) -> str:
         return f.read()
 
 
-def execute_sql_statements(connection, sql_content: str):
-    """Execute SQL statements from the file."""
+def split_sql_statements(sql_content: str) -> list:
+    """Split the SQL file into statements, dropping blank lines and comments."""
     # Split by semicolon but handle comments properly
     statements = []
     current_statement = []
@@ -59,6 +59,22 @@ def execute_sql_statements(connection, sql_content: str):
             statements.append(full_statement)
             current_statement = []
     
+    return statements
+
+
+def execute_sql_statements(connection, sql_content: str):
+    """Execute SQL statements from the file."""
+    statements = split_sql_statements(sql_content)
+    
+    # Send the whole script in one round trip; Postgres parses and runs it as a single batch
+    try:
+        connection.exec_driver_sql('\n'.join(statements))
+        connection.commit()
+        return len(statements), 0
+    except Exception as e:
+        connection.rollback()
+        logger.warning(f"Batched seed script failed ({e}), retrying statement by statement")
+    
     # Execute each statement
     success_count = 0
     error_count = 0
@@ -1,3 +1,4 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
@@ -8,31 +9,56 @@ from src.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Create a read-only engine
-_ro_engine = None
+RO_POOL_SIZE = min(32, (os.cpu_count() or 1) * 4)
+RO_POOL_MAX_OVERFLOW = 20
+
+def _create_ro_engine():
+    # Mask password in log output
+    dsn = settings.postgres_ro_dsn
+    masked_dsn = dsn.split('@')[-1] if '@' in dsn else dsn
+    logger.info(f"Initializing read-only database engine for {masked_dsn} | pool_size={RO_POOL_SIZE}")
+    return create_engine(
+        settings.postgres_ro_dsn,
+        poolclass=QueuePool,
+        pool_size=RO_POOL_SIZE,
+        max_overflow=RO_POOL_MAX_OVERFLOW,
+        pool_timeout=5,  # Fail fast instead of queueing behind a slow query for 30s
+        pool_recycle=1800,
+        pool_use_lifo=True,  # Hand out the most recently returned (warm) connection first
+        pool_pre_ping=True,
+        connect_args={
+            "connect_timeout": 10,
+            "options": "-c statement_timeout=5000",  # 5 seconds
+        }
+    )
+
+# Read-only engine, created once at import (the session factory below binds to it)
+ro_engine = _create_ro_engine()
 
 def get_ro_engine():
-    global _ro_engine
-    if _ro_engine is None:
-        # Mask password in log output
-        dsn = settings.postgres_ro_dsn
-        masked_dsn = dsn.split('@')[-1] if '@' in dsn else dsn
-        logger.info(f"Initializing read-only database engine for {masked_dsn}")
-        _ro_engine = create_engine(
-            settings.postgres_ro_dsn,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_pre_ping=True,
-            connect_args={
-                "connect_timeout": 10,
-                "options": "-c statement_timeout=5000",  # 5 seconds
-            }
-        )
-    return _ro_engine
+    return ro_engine
+
+def warm_ro_pool(connections: int = 5) -> None:
+    """Open pooled connections up front so first requests skip the TLS/auth handshake."""
+    engine = get_ro_engine()
+    conns = []
+    try:
+        for _ in range(connections):
+            conns.append(engine.connect())
+        logger.info(f"Warmed read-only pool with {len(conns)} connections")
+    except Exception as e:
+        logger.warning(f"Failed to warm read-only pool: {e}")
+    finally:
+        for conn in conns:
+            conn.close()
+
+def dispose_ro_engine() -> None:
+    """Close all pooled read-only connections."""
+    ro_engine.dispose()
+    logger.info("Disposed read-only database engine")
 
 # Session factory
-ReadOnlySession = sessionmaker(bind=get_ro_engine(), autoflush=False, autocommit=False)
+ReadOnlySession = sessionmaker(bind=ro_engine, autoflush=False, autocommit=False)
 
 @contextmanager
 def get_ro_session() -> Generator[Session, None, None]:
@@ -1,57 +1,88 @@
-from typing import List, Dict, Any
+import logging
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, Union
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
 from .connection import get_ro_session
 from .validator import validate_sql_query, SQLValidationError
 from src.logger import get_logger
 
 logger = get_logger(__name__)
 
+@lru_cache(maxsize=128)
+def _compile_cached(statement: TextClause, dialect):
+    """Compiled form of a module-level text() constant; ad-hoc strings are compiled per call instead."""
+    return statement.compile(dialect=dialect)
+
 class QueryExecutor:
     """Executes validated SELECT queries against read-only DB."""
     
     @staticmethod
-    def execute_raw_sql(query: str, user_id: str, params: Dict[str, Any]) -> List[Dict]:
+    def execute_raw_sql(query: Union[str, TextClause], user_id: str, params: Dict[str, Any]) -> List[Dict]:
         """
         Execute a raw SQL query with safety validation.
         
         Args:
-            query: SQL string (must be SELECT)
+            query: SQL string or pre-built text() clause (must be SELECT)
             user_id: User ID for filtering validation
             params: Optional query parameters (use :param_name in query)
         
         Returns:
             List of dicts (rows)
         """
-        import time
         start_time = time.perf_counter()
-        query_preview = query[:80] + "..." if len(query) > 80 else query
+        prebuilt = isinstance(query, TextClause)
+        statement = query if prebuilt else text(query)
+        query = statement.text
         
         # Validate safety
         try:
             validate_sql_query(query)
-            logger.debug(f"[SQL] Query validated for user {user_id}")
         except SQLValidationError as e:
             logger.warning(f"[SQL] Validation FAILED for user {user_id}: {e}")
             raise
 
-        logger.info(f"[SQL] Executing query for user {user_id} | query='{query_preview}'")
+        # Per-query chatter is DEBUG with deferred %-style args; the preview is only sliced when it will be emitted
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            query_preview = query[:80] + "..." if len(query) > 80 else query
+            logger.debug("[SQL] Executing validated query for user %s | query='%s'", user_id, query_preview)
         
         try:
             with get_ro_session() as session:
                 exec_start = time.perf_counter()
-                result = session.execute(text(query), params or {})
-                # Convert to list of dicts
-                rows = [dict(row._mapping) for row in result]
-                exec_duration = (time.perf_counter() - exec_start) * 1000
-                total_duration = (time.perf_counter() - start_time) * 1000
-                
-                logger.info(f"[SQL] Query complete | rows={len(rows)} | exec={exec_duration:.2f}ms | total={total_duration:.2f}ms")
+                rows = QueryExecutor._fetch_dicts(session, statement, params or {}, cache=prebuilt)
+                if debug:
+                    exec_duration = (time.perf_counter() - exec_start) * 1000
+                    total_duration = (time.perf_counter() - start_time) * 1000
+                    logger.debug("[SQL] Query complete | rows=%d | exec=%.2fms | total=%.2fms", len(rows), exec_duration, total_duration)
                 return rows
         except Exception as e:
             duration = (time.perf_counter() - start_time) * 1000
             logger.error(f"[SQL] Query FAILED after {duration:.2f}ms | user_id={user_id} | error={e}")
             raise
     
+    @staticmethod
+    def _fetch_dicts(session, statement: TextClause, params: Dict[str, Any], cache: bool = False) -> List[Dict]:
+        """
+        Run a text() statement on the session's DBAPI cursor and zip column names with the raw tuples,
+        skipping SQLAlchemy's per-row Row/RowMapping construction. text() columns are untyped, so the
+        driver's values are what the ORM result would have returned anyway.
+        """
+        connection = session.connection()
+        compiled = _compile_cached(statement, connection.dialect) if cache else statement.compile(dialect=connection.dialect)
+        bound = compiled.construct_params(params)
+        if compiled.positional:
+            bound = tuple(bound[name] for name in compiled.positiontup)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute(compiled.string, bound)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
     @staticmethod
     def execute_orm_query(query_func, user_id: str) -> List:
         """
@@ -7,6 +7,8 @@ logger = get_logger(__name__)
 FORBIDDEN_KEYWORDS = [
     'UPDATE', 'DELETE', 'INSERT', 'DROP', 'ALTER', 'TRUNCATE', 'CREATE', 'REPLACE', 'GRANT', 'REVOKE'
 ]
+# One alternation compiled at import: a single scan of the query instead of one search per keyword
+_FORBIDDEN_RE = re.compile(r'\b(' + '|'.join(FORBIDDEN_KEYWORDS) + r')\b')
 
 class SQLValidationError(Exception):
     """Custom exception for SQL validation errors."""
@@ -20,10 +22,12 @@ def validate_sql_query(query: str) -> bool:
         logger.warning(f"SQL Validation failed: Query must start with SELECT or WITH. Query: {query[:50]}...")
         raise SQLValidationError("Only SELECT and WITH statements are allowed.")
 
-    for keyword in FORBIDDEN_KEYWORDS:
-        if re.search(r'\b' + keyword + r'\b', upper_query):
-            logger.warning(f"SQL Validation failed: Forbidden keyword '{keyword}' found. Query: {query[:50]}...")
-            raise SQLValidationError(f"Forbidden SQL operation detected: {keyword}")
+    # Plain substring checks first (memchr-fast); most queries contain none, so the regex rarely runs
+    match = _FORBIDDEN_RE.search(upper_query) if any(k in upper_query for k in FORBIDDEN_KEYWORDS) else None
+    if match:
+        keyword = match.group(1)
+        logger.warning(f"SQL Validation failed: Forbidden keyword '{keyword}' found. Query: {query[:50]}...")
+        raise SQLValidationError(f"Forbidden SQL operation detected: {keyword}")
         
     if ';' in query.rstrip(';'):
         logger.warning(f"SQL Validation failed: Multiple statements detected. Query: {query[:50]}...")
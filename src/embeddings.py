@@ -4,9 +4,16 @@ Handles caching, batching, and device management.
 """
 from __future__ import annotations
 import hashlib
+import logging
+import threading
+import time
 import redis
 import json
-from typing import List
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
 from src.config import settings
 from src.logger import get_logger
 
@@ -17,6 +24,19 @@ _embedding_model = None
 _openai_client = None
 _redis_client = None
 
+# In-process LRU in front of the Redis embedding cache (float32 vectors keyed by text hash)
+EMBEDDING_MEMORY_CACHE_SIZE = 10_000
+_memory_cache: OrderedDict = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+EMBEDDING_BATCH_SIZE = 64  # Texts per forward pass for the local model
+TEXT_HASH_CACHE_SIZE = 4096  # Memoized normalize_text / compute_text_hash results (re-asked queries, retries)
+
+# Redis values: 1-byte dtype tag + raw little-endian vector (4 bytes/float vs ~20 as JSON text).
+# Entries written as JSON lists by older versions start with b"[" and are still readable
+_EMBEDDING_DTYPES = {b"f": np.dtype("<f4"), b"h": np.dtype("<f2")}
+_EMBEDDING_STORE_TAG = b"f"
+
 def get_redis_client():
     global _redis_client
     if _redis_client is None:
@@ -35,11 +55,67 @@ def _get_local_model():
             logger.warning("CUDA requested but not available, falling back to CPU")
             device = "cpu"
         
-        logger.info(f"Loading {settings.embedding_model} on {device}")
-        _embedding_model = SentenceTransformer(settings.embedding_model, device=device)
+        backend = settings.embedding_backend
+        logger.info(f"Loading {settings.embedding_model} on {device} | backend={backend}")
+        # "onnx"/"openvino" run the exported graph (fused attention/GEMM kernels) through ONNX Runtime/OpenVINO,
+        # exporting on first load if the model repo ships no ONNX file; needs sentence-transformers[onnx|openvino]
+        model = SentenceTransformer(settings.embedding_model, device=device, backend=backend)
+        if backend == "torch":
+            model = _apply_precision(model, device, settings.embedding_precision)
+        _embedding_model = model
     return _embedding_model
 
 
+def _apply_precision(model, device: str, precision: str):
+    """
+    Cast/quantize the loaded model for settings.embedding_precision. Lower precision halves (or quarters) the
+    bytes per weight streamed through each matmul; vectors are still normalized float32 on the way out.
+    Changing precision shifts vectors slightly, so keep it stable for a collection's lifetime.
+    """
+    import torch
+
+    if precision == "auto":
+        precision = "fp16" if device == "cuda" else "fp32"
+    if precision == "int8" and device != "cpu":
+        logger.warning("int8 embedding precision is CPU-only, using fp16 on GPU")
+        precision = "fp16"
+    if precision == "fp16" and device == "cpu":
+        logger.warning("fp16 embedding precision is slow on CPU, using fp32")
+        precision = "fp32"
+
+    if precision == "fp16":
+        model.half()
+    elif precision == "bf16":
+        model.to(torch.bfloat16)
+    elif precision == "int8":
+        # Dynamic quantization of the transformer's Linear layers (int8 GEMMs via VNNI/AVX-512 where available);
+        # takes well under a second for MiniLM-sized models, so it is redone at load rather than cached on disk
+        transformer = model[0]
+        transformer.auto_model = torch.quantization.quantize_dynamic(
+            transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif precision != "fp32":
+        raise ValueError(f"Unknown embedding precision: {precision}")
+    logger.info(f"Embedding model precision: {precision}")
+    return model
+
+
+def _encode_local(texts: List[str]) -> np.ndarray:
+    """
+    Encode texts with the local model in batches of EMBEDDING_BATCH_SIZE, on the device it was loaded on.
+    Vectors come back unit-length (collections use cosine distance, so rankings are unchanged) as float32.
+    """
+    # show_progress_bar defaults to on at INFO log level, which adds a tqdm bar to every call
+    embeddings = _get_local_model().encode(
+        texts,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return embeddings.astype(np.float32, copy=False)
+
+
 def _get_openai_client():
     """Lazy load OpenAI client."""
     global _openai_client
@@ -49,6 +125,7 @@ def _get_openai_client():
     return _openai_client
 
 
+@lru_cache(maxsize=TEXT_HASH_CACHE_SIZE)
 def normalize_text(text: str) -> str:
     """Normalize text for consistent hashing and embedding."""
     return " ".join(text.strip().lower().split())
@@ -57,16 +134,43 @@ def get_embedding_dimension() -> int:
     """Return the embedding dimension for the configured model."""
     return settings.embedding_dimension
 
-def compute_text_hash(text: str) -> str:
-    """Compute a simple hash for the text for caching purposes."""
-    normalized_text = normalize_text(text)
-    return hashlib.sha256(normalized_text.encode('utf-8')).hexdigest()
+# Cache keys only need to be collision-resistant, not a cryptographic commitment: BLAKE2b-128 is as fast as
+# SHA-256 with SHA-NI and faster without it, and halves the key length
+_TEXT_HASHERS = {
+    "blake2b": lambda data: hashlib.blake2b(data, digest_size=16).hexdigest(),
+    "sha256": lambda data: hashlib.sha256(data).hexdigest(),
+}
+
+def compute_text_hash(text: str, algo: Optional[str] = None) -> str:
+    """Compute a simple hash for the text for caching purposes (settings.embedding_hash_algo by default)."""
+    # Resolve the default here, outside the cache, so a settings change takes effect immediately
+    return _hash_text(text, algo or settings.embedding_hash_algo)
+
+@lru_cache(maxsize=TEXT_HASH_CACHE_SIZE)
+def _hash_text(text: str, algo: str) -> str:
+    return _TEXT_HASHERS[algo](normalize_text(text).encode('utf-8'))
+
+def _legacy_text_hashes(texts: List[str]) -> Optional[List[str]]:
+    """Keys the texts had under SHA-256, while migrating to another algorithm; None otherwise."""
+    if not settings.embedding_hash_migrate or settings.embedding_hash_algo == "sha256":
+        return None
+    return [compute_text_hash(text, "sha256") for text in texts]
+
+def _read_legacy_entries(redis_client, texts: List[str], hashes: List[str]) -> List[Optional[bytes]]:
+    """Cached values still stored under the legacy keys, copied to the current keys on the way (one MGET/MSET)."""
+    legacy_hashes = _legacy_text_hashes(texts)
+    if not legacy_hashes:
+        return [None] * len(texts)
+    values = redis_client.mget(legacy_hashes)
+    found = {text_hash: value for text_hash, value in zip(hashes, values) if value is not None}
+    if found:
+        redis_client.mset(found)
+    return values
 
 def generate_embedding(text: str) -> List[float]:
     """Generate embedding for a single text without caching."""
     if settings.embedding_provider == "local":
-        model = _get_local_model()
-        embedding = model.encode([text])[0].tolist()
+        embedding = _encode_local([text])[0].tolist()
     elif settings.embedding_provider == "openai":
         client = _get_openai_client()
         response = client.embeddings.create(
@@ -78,21 +182,72 @@ def generate_embedding(text: str) -> List[float]:
         raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
     return embedding
 
+def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings for several texts in one model call / API request, without caching."""
+    if not texts:
+        return []
+    if settings.embedding_provider == "local":
+        embeddings = _encode_local(texts).tolist()
+    elif settings.embedding_provider == "openai":
+        client = _get_openai_client()
+        response = client.embeddings.create(
+            input=texts,
+            model=settings.embedding_model
+        )
+        embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    else:
+        raise ValueError(f"Unknown embedding provider: {settings.embedding_provider}")
+    return embeddings
+
+def _encode_embedding(embedding) -> bytes:
+    return _EMBEDDING_STORE_TAG + np.asarray(embedding, dtype=_EMBEDDING_DTYPES[_EMBEDDING_STORE_TAG]).tobytes()
+
+def _decode_embedding(raw: bytes) -> np.ndarray:
+    if raw[:1] == b"[":
+        return np.asarray(json.loads(raw), dtype=np.float32)
+    return np.frombuffer(raw, dtype=_EMBEDDING_DTYPES[raw[:1]], offset=1).astype(np.float32)
+
+def _memory_cache_get(text_hash: str) -> Optional[List[float]]:
+    with _memory_cache_lock:
+        vector = _memory_cache.get(text_hash)
+        if vector is None:
+            return None
+        _memory_cache.move_to_end(text_hash)
+    return vector.tolist()
+
+def _memory_cache_put(text_hash: str, embedding: List[float]):
+    vector = np.asarray(embedding, dtype=np.float32)
+    with _memory_cache_lock:
+        _memory_cache[text_hash] = vector
+        _memory_cache.move_to_end(text_hash)
+        while len(_memory_cache) > EMBEDDING_MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
 def get_embedding_from_cache(text: str) -> List[float]:
-    """Get embedding for a single text, using cache if available."""
-    import time
+    """Get embedding for a single text, checking the in-process LRU, then Redis, before generating."""
     start_time = time.perf_counter()
     
     text_hash = compute_text_hash(text)
     text_preview = text[:50] + "..." if len(text) > 50 else text
+
+    embedding = _memory_cache_get(text_hash)
+    if embedding is not None:
+        if logger.isEnabledFor(logging.DEBUG):
+            duration = (time.perf_counter() - start_time) * 1000
+            logger.debug(f"[CACHE HIT] Embedding retrieved from memory in {duration:.2f}ms | hash={text_hash[:12]}... | text='{text_preview}'")
+        return embedding
+
     redis_client = get_redis_client()
     
     cached: bytes | None = redis_client.get(text_hash)  # type: ignore[assignment]
+    if cached is None:
+        cached = _read_legacy_entries(redis_client, [text], [text_hash])[0]
     if cached is not None:
         duration = (time.perf_counter() - start_time) * 1000
         logger.info(f"[CACHE HIT] Embedding retrieved from cache in {duration:.2f}ms | hash={text_hash[:12]}... | text='{text_preview}'")
-        cached_str = cached.decode('utf-8') if isinstance(cached, bytes) else str(cached)
-        return json.loads(cached_str)
+        vector = _decode_embedding(cached)
+        _memory_cache_put(text_hash, vector)
+        return vector.tolist()
     
     # Cache miss - generate new embedding
     gen_start = time.perf_counter()
@@ -100,14 +255,57 @@ def get_embedding_from_cache(text: str) -> List[float]:
     gen_duration = (time.perf_counter() - gen_start) * 1000
     
     # Cache the embedding
-    redis_client.set(text_hash, json.dumps(embedding))
+    redis_client.set(text_hash, _encode_embedding(embedding))
+    _memory_cache_put(text_hash, embedding)
     
     total_duration = (time.perf_counter() - start_time) * 1000
     logger.info(f"[CACHE MISS] Embedding generated in {gen_duration:.2f}ms, cached | hash={text_hash[:12]}... | text='{text_preview}' | total={total_duration:.2f}ms")
     return embedding
 
+def get_embeddings_from_cache(texts: List[str]) -> List[List[float]]:
+    """
+    Batch version of get_embedding_from_cache: one Redis MGET for the texts not in memory, one
+    generate_embeddings call for the rest, and one MSET write-back. Results follow input order.
+    """
+    start_time = time.perf_counter()
+    hashes = [compute_text_hash(text) for text in texts]
+    embeddings: List[Optional[List[float]]] = [_memory_cache_get(text_hash) for text_hash in hashes]
+
+    pending = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    redis_client = get_redis_client()
+    if pending:
+        values = redis_client.mget([hashes[i] for i in pending])
+        absent = [k for k, value in enumerate(values) if value is None]
+        if absent:
+            legacy = _read_legacy_entries(redis_client, [texts[pending[k]] for k in absent], [hashes[pending[k]] for k in absent])
+            for k, value in zip(absent, legacy):
+                values[k] = value
+        for i, cached in zip(pending, values):
+            if cached is not None:
+                vector = _decode_embedding(cached)
+                _memory_cache_put(hashes[i], vector)
+                embeddings[i] = vector.tolist()
+
+    missing = [i for i in pending if embeddings[i] is None]
+    if missing:
+        to_generate = {}  # text_hash -> text; duplicate texts in the batch are generated once
+        for i in missing:
+            to_generate.setdefault(hashes[i], texts[i])
+        generated = dict(zip(to_generate, generate_embeddings(list(to_generate.values()))))
+        redis_client.mset({text_hash: _encode_embedding(embedding) for text_hash, embedding in generated.items()})
+        for text_hash, embedding in generated.items():
+            _memory_cache_put(text_hash, embedding)
+        for i in missing:
+            embeddings[i] = generated[hashes[i]]
+
+    total_duration = (time.perf_counter() - start_time) * 1000
+    logger.info(f"[CACHE BATCH] Embeddings for {len(texts)} | cached={len(texts) - len(missing)} | generated={len(missing)} | total={total_duration:.2f}ms")
+    return embeddings
+
 __all__ = [
     "get_embedding_from_cache",
+    "get_embeddings_from_cache",
+    "generate_embeddings",
     "get_embedding_dimension",
     "generate_embedding",
     "compute_text_hash",
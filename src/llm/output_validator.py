@@ -1,8 +1,15 @@
 import re
+import threading
 from src.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Optional: Hyperscan pre-screens outputs with all patterns in one SIMD DFA pass, so clean outputs skip `re`
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 class OutputValidator:
     """
     A class to validate and sanitize outputs from language models.
@@ -24,15 +31,59 @@ class OutputValidator:
         r'user_id\s*[:=]\s*["\']?\d+["\']?(?!.*(?:your|you|trader))'
     ]
 
+    # Compiled once, then applied one pattern at a time in list order like the original loop, so where matches
+    # overlap a later pattern still redacts text an earlier one didn't consume. Each entry pairs the detector
+    # (run on the lowercased original output) with the case-insensitive redactor (run on the running output)
+    _COMPILED = [(p, re.compile(p), re.compile(p, re.IGNORECASE)) for p in FORBIDDEN_PATTERNS]
+
     @classmethod
     def sanitize_output(cls, output: str) -> str:
         """
         Sanitize the output by removing forbidden patterns.
         """
         response_lower = output.lower()
-        for pattern in cls.FORBIDDEN_PATTERNS:
-            if re.search(pattern, response_lower):
+        # The prefilter screens the same lowercased text the detectors search, so a miss means no detector fires
+        if _prefilter is not None and not _prefilter_matches(response_lower):
+            return output
+        for pattern, detector, redactor in cls._COMPILED:
+            if detector.search(response_lower):
                 logger.error(f"Forbidden pattern detected: {pattern}")
-                output = re.sub(pattern, "[REDACTED]", output, flags=re.IGNORECASE)
+                output = redactor.sub("[REDACTED]", output)
         return output
-        
\ No newline at end of file
+
+def _build_prefilter(patterns: list):
+    """
+    Hyperscan block-mode database of all patterns, or None without hyperscan. Compiled with PREFILTER, so
+    constructs Hyperscan lacks (the lookahead) are approximated by a superset: it can only over-report,
+    and every hit is confirmed by the `re` pass.
+    """
+    if hyperscan is None:
+        return None
+    flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_PREFILTER
+             | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP)
+    try:
+        database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        database.compile(
+            expressions=[p.removeprefix("(?i)").encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=[flags] * len(patterns),
+        )
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan prefilter unavailable, using re only: {e}")
+        return None
+
+def _stop_scan(*_) -> bool:
+    return True  # First hit is enough: the `re` pass does the redaction
+
+def _prefilter_matches(output: str) -> bool:
+    with _prefilter_lock:  # The database's scratch space is not safe to share across threads
+        try:
+            _prefilter.scan(output.encode(), match_event_handler=_stop_scan)
+        except hyperscan.ScanTerminated:
+            return True
+    return False
+
+_prefilter = _build_prefilter(OutputValidator.FORBIDDEN_PATTERNS)
+_prefilter_lock = threading.Lock()
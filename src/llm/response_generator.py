@@ -1,26 +1,37 @@
 import time
-from typing import Generator, Optional
+from functools import lru_cache
+from typing import AsyncGenerator, Optional
 
 from src.config import settings
 from src.logger import get_logger
-from src.utils.clients import get_openai_client, get_openrouter_client
+from src.utils.clients import get_async_openai_client, get_async_openrouter_client
 from .prompt_modifier import PromptModifier
 
 logger = get_logger(__name__)
 
+# Shown in place of the answer when the LLM call fails
+LLM_FALLBACK_RESPONSE = (
+    "I apologize, but I encountered an error while analyzing your data. Please try again in a moment."
+)
+
+class LLMResponseError(Exception):
+    """The LLM call failed. Callers answer with LLM_FALLBACK_RESPONSE and must not cache the turn."""
+
 class ResponseGenerator:
     def __init__(self):
         if settings.model_provider == "openrouter":
             self.provider = "openrouter"
-            self.client = get_openrouter_client()
+            self.async_client = get_async_openrouter_client()
         else:
             self.provider = "openai"
-            self.client = get_openai_client()
+            self.async_client = get_async_openai_client()
         self.model = settings.analysis_model
 
-    def generate_response(self, user_query: str, context: str, user_name: str = "Trader", current_date: Optional[str] = None, date_period_context: Optional[str] = None, is_followup: bool = False, trade_scope: Optional[list] = None) -> str:
+    async def generate_response(self, user_query: str, context: str, user_name: str = "Trader", current_date: Optional[str] = None, date_period_context: Optional[str] = None, is_followup: bool = False, trade_scope: Optional[list] = None) -> str:
         """
         Generates a response using the configured LLM provider (non-streaming).
+        Awaits the async client so the event loop keeps serving other requests during the call.
+        Raises LLMResponseError if the call fails.
         """
         start_time = time.perf_counter()
         from src.api.helpers import InputSanitizer
@@ -54,7 +65,7 @@ Previous context: {len(trade_scope)} trades in scope
         try:
             api_start = time.perf_counter()
             if self.provider == "openrouter":
-                response = self.client.chat.completions.create(
+                response = await self.async_client.chat.completions.create(
                     model=self.model,
                     messages=[
                         {"role": "system", "content": formatted_system_prompt},
@@ -70,7 +81,7 @@ Previous context: {len(trade_scope)} trades in scope
                     logger.info(f"[LLM] Token usage | input={usage.prompt_tokens} | output={usage.completion_tokens} | total={usage.total_tokens}")
             else:
                 # Assuming standard OpenAI chat completion structure for consistency
-                response = self.client.responses.create(
+                response = await self.async_client.responses.create(
                     model=self.model,
                     input=[
                         {"role": "system", "content": formatted_system_prompt},
@@ -97,9 +108,9 @@ Previous context: {len(trade_scope)} trades in scope
         except Exception as e:
             duration = (time.perf_counter() - start_time) * 1000
             logger.error(f"[LLM] Response generation FAILED after {duration:.2f}ms | error={e}")
-            return "I apologize, but I encountered an error while analyzing your data. Please try again in a moment."
+            raise LLMResponseError(str(e)) from e
 
-    def generate_response_stream(
+    async def generate_response_stream(
         self, 
         user_query: str, 
         context: str, 
@@ -108,10 +119,11 @@ Previous context: {len(trade_scope)} trades in scope
         date_period_context: Optional[str] = None,
         is_followup: bool = False,
         trade_scope: Optional[list] = None
-    ) -> Generator[str, None, None]:
+    ) -> AsyncGenerator[str, None]:
         """
         Generates a streaming response using the configured LLM provider.
-        Yields text chunks as they arrive from the API.
+        Yields text chunks as they arrive from the API without blocking the event loop.
+        Raises LLMResponseError if the call fails (text already yielded stands).
         """
         start_time = time.perf_counter()
         query_preview = user_query[:50] + "..." if len(user_query) > 50 else user_query
@@ -148,7 +160,7 @@ Previous context: {len(trade_scope)} trades in scope
             api_start = time.perf_counter()
             if self.provider == "openrouter":
                 # OpenRouter uses standard OpenAI chat completions API
-                stream = self.client.chat.completions.create(
+                stream = await self.async_client.chat.completions.create(
                     model=self.model,
                     messages=[
                         {"role": "system", "content": formatted_system_prompt},
@@ -163,7 +175,7 @@ Previous context: {len(trade_scope)} trades in scope
                     }
                 )
                 
-                for chunk in stream:
+                async for chunk in stream:
                     if chunk.choices and chunk.choices[0].delta.content:
                         if first_chunk_time is None:
                             first_chunk_time = (time.perf_counter() - api_start) * 1000
@@ -175,7 +187,7 @@ Previous context: {len(trade_scope)} trades in scope
                         
             else:
                 # OpenAI Responses API with streaming
-                stream = self.client.responses.create(
+                stream = await self.async_client.responses.create(
                     model=self.model,
                     input=[
                         {"role": "system", "content": formatted_system_prompt},
@@ -184,7 +196,7 @@ Previous context: {len(trade_scope)} trades in scope
                     stream=True
                 )
                 
-                for event in stream:
+                async for event in stream:
                     # Handle response.output_text.delta events
                     if event.type == "response.output_text.delta":
                         if hasattr(event, 'delta') and event.delta:
@@ -202,8 +214,7 @@ Previous context: {len(trade_scope)} trades in scope
                                 logger.info(f"[LLM_STREAM] Token usage | input={response_obj.usage.input_tokens} | output={response_obj.usage.output_tokens} | total={response_obj.usage.total_tokens}")
                     elif event.type == "error":
                         error_msg = str(event) if event else "Unknown error"
-                        logger.error(f"[LLM_STREAM] Stream error: {error_msg}")
-                        yield f"\n\n[Error: {error_msg}]"
+                        raise ValueError(f"Stream error: {error_msg}")
 
             total_duration = (time.perf_counter() - start_time) * 1000
             ttft = first_chunk_time or 0
@@ -212,4 +223,9 @@ Previous context: {len(trade_scope)} trades in scope
         except Exception as e:
             duration = (time.perf_counter() - start_time) * 1000
             logger.error(f"[LLM_STREAM] Streaming FAILED after {duration:.2f}ms | error={e}")
-            yield "I apologize, but I encountered an error while analyzing your data. Please try again in a moment."
\ No newline at end of file
+            raise LLMResponseError(str(e)) from e
+
+@lru_cache(maxsize=1)
+def get_response_generator() -> ResponseGenerator:
+    """Shared ResponseGenerator so LLM clients and config are reused across requests."""
+    return ResponseGenerator()
@@ -22,6 +22,8 @@ class ColoredFormatter(logging.Formatter):
         '[API]': '\033[94m',         # Light blue
         '[ROUTER]': '\033[95m',      # Light magenta
         '[RETRIEVER]': '\033[96m',   # Light cyan
+        '[RETRIEVAL_CACHE]': '\033[96m', # Light cyan
+        '[RESPONSE_CACHE]': '\033[96m', # Light cyan
         '[SQL]': '\033[93m',         # Light yellow
         '[VECTOR_SEARCH]': '\033[92m', # Light green
         '[CACHE': '\033[91m',        # Light red (for HIT/MISS visibility)
@@ -1,11 +1,13 @@
+import logging
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from src.database.queries import TradeQueries
 from src.vector_db.vector_store import JournalStore
+from src.cache.retrieval import get_retrieval_cache
 from src.logger import get_logger
-from .router import QueryRouter
+from .router import get_query_router
 from .date_utils import DateQueryClassifier
 
 logger = get_logger(__name__)
@@ -25,12 +27,18 @@ class DataRetriever:
         self.date_context = None  # Store extracted date context
         self.timings = {}  # Track component timings
 
-    def retrieve_data(self, user_query: str, anchor_scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Retrieve data based on the analyzed query type. If anchor_scope provided, constrain to those IDs."""
+    def retrieve_data(
+        self,
+        user_query: str,
+        anchor_scope: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Retrieve data based on the analyzed query type. If anchor_scope provided, constrain to those IDs.
+        A precomputed query_embedding is reused for journal search instead of embedding the query again."""
         total_start = time.perf_counter()
-        query_preview = user_query[:60] + "..." if len(user_query) > 60 else user_query
-        
-        logger.info(f"[RETRIEVER] Starting data retrieval for user {self.user_id} | query='{query_preview}' | anchored={anchor_scope is not None}")
+        if logger.isEnabledFor(logging.INFO):
+            query_preview = user_query[:60] + "..." if len(user_query) > 60 else user_query
+            logger.info(f"[RETRIEVER] Starting data retrieval for user {self.user_id} | query='{query_preview}' | anchored={anchor_scope is not None}")
         
         # Step 0: Extract date context from query
         date_context = DateQueryClassifier.extract_date_context(user_query, self.current_date)
@@ -41,18 +49,35 @@ class DataRetriever:
         
         # If anchor_scope is provided (follow-up), use ID-based retrieval
         if anchor_scope and (anchor_scope.get("trade_ids") or anchor_scope.get("journal_ids")):
-            return self._retrieve_anchored(user_query, anchor_scope)
-        
-        # Otherwise, standard router-based retrieval
-        return self._retrieve_standard(user_query, date_context)
+            return self._retrieve_anchored(user_query, anchor_scope, query_embedding)
+        
+        # Otherwise, standard router-based retrieval, served from the short-lived cache when possible
+        # (anchored follow-ups skip the cache since their result depends on the anchor scope)
+        cache = get_retrieval_cache()
+        date_key = (date_context[0], date_context[1]) if date_context else None
+        cached = cache.get(self.user_id, user_query, date_key)
+        if cached is not None:
+            self.query_analysis = cached["query_analysis"]
+            self.timings["total"] = (time.perf_counter() - total_start) * 1000
+            logger.info(f"[RETRIEVER] Completed (cached) | sources={list(cached['data'].keys())} | total={self.timings['total']:.2f}ms")
+            return dict(cached["data"])
+        
+        data = self._retrieve_standard(user_query, date_context, query_embedding)
+        cache.put(self.user_id, user_query, date_key, {"data": data, "query_analysis": self.query_analysis})
+        return data
     
-    def _retrieve_standard(self, user_query: str, date_context: Optional[Tuple]) -> Dict[str, Any]:
+    def _retrieve_standard(
+        self,
+        user_query: str,
+        date_context: Optional[Tuple],
+        query_embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
         """Standard router-based retrieval (non-anchored)."""
         total_start = time.perf_counter()
         
         # Step 1: Route the query
         router_start = time.perf_counter()
-        self.query_analysis = QueryRouter().analyze_query(user_query)
+        self.query_analysis = get_query_router().analyze_query(user_query)
         self.timings["router"] = (time.perf_counter() - router_start) * 1000
         
         data = {}
@@ -81,11 +106,11 @@ class DataRetriever:
         if query_type in ["journal_only", "mixed"]:
             journal_start = time.perf_counter()
             logger.info(f"[RETRIEVER] Searching journal entries in Qdrant for user {self.user_id}...")
-            journal_store = JournalStore()
-            journals = journal_store.search_journals(
+            journals = JournalStore.search_journals(
                 user_id=self.user_id,
                 query_text=user_query,
-                limit=5
+                limit=5,
+                query_embedding=query_embedding
             )
             self.timings["journals_vector"] = (time.perf_counter() - journal_start) * 1000
             data["journals"] = journals
@@ -95,14 +120,19 @@ class DataRetriever:
         total_duration = (time.perf_counter() - total_start) * 1000
         self.timings["total"] = total_duration
         
-        timing_breakdown = " | ".join([f"{k}={v:.0f}ms" for k, v in self.timings.items()])
-        sources = list(data.keys())
-        record_counts = {k: len(v) if isinstance(v, list) else 1 for k, v in data.items()}
-        
-        logger.info(f"[RETRIEVER] Completed (standard) | sources={sources} | records={record_counts} | {timing_breakdown}")
+        if logger.isEnabledFor(logging.INFO):
+            timing_breakdown = " | ".join([f"{k}={v:.0f}ms" for k, v in self.timings.items()])
+            sources = list(data.keys())
+            record_counts = {k: len(v) if isinstance(v, list) else 1 for k, v in data.items()}
+            logger.info(f"[RETRIEVER] Completed (standard) | sources={sources} | records={record_counts} | {timing_breakdown}")
         return data
     
-    def _retrieve_anchored(self, user_query: str, anchor_scope: Dict[str, Any]) -> Dict[str, Any]:
+    def _retrieve_anchored(
+        self,
+        user_query: str,
+        anchor_scope: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
         """Anchored retrieval using IDs from previous query (follow-up mode)."""
         total_start = time.perf_counter()
         
@@ -114,7 +144,7 @@ class DataRetriever:
         # Fallback if anchor is empty
         if not trade_ids and not journal_ids:
             logger.warning(f"[RETRIEVER] Empty anchor_scope, falling back to standard retrieval")
-            return self._retrieve_standard(user_query, self.date_context)
+            return self._retrieve_standard(user_query, self.date_context, query_embedding)
         
         data = {}
         
@@ -130,7 +160,7 @@ class DataRetriever:
         # Optionally classify follow-up to decide if we need journals (augmentation)
         # Use router only to determine "do we need extra data?", not to widen trades
         router_start = time.perf_counter()
-        self.query_analysis = QueryRouter().analyze_query(user_query)
+        self.query_analysis = get_query_router().analyze_query(user_query)
         self.timings["router"] = (time.perf_counter() - router_start) * 1000
         query_type = self.query_analysis.get("query_type")
         
@@ -143,8 +173,7 @@ class DataRetriever:
             if journal_ids:
                 # Retrieve specific journals by ID (anchor set)
                 logger.info(f"[RETRIEVER] Fetching {len(journal_ids)} journals by ID for user {self.user_id}...")
-                journal_store = JournalStore()
-                journals = journal_store.get_journals_by_ids(
+                journals = JournalStore.get_journals_by_ids(
                     user_id=self.user_id,
                     journal_ids=journal_ids,
                     include_text=True  # Include text for follow-up analysis
@@ -155,11 +184,11 @@ class DataRetriever:
             elif query_type in ["journal_only", "mixed"]:
                 # Augmentation: search for new journals relevant to follow-up
                 logger.info(f"[RETRIEVER] Augmenting with journal search for user {self.user_id}...")
-                journal_store = JournalStore()
-                journals = journal_store.search_journals(
+                journals = JournalStore.search_journals(
                     user_id=self.user_id,
                     query_text=user_query,
-                    limit=5
+                    limit=5,
+                    query_embedding=query_embedding
                 )
                 self.timings["journals_vector"] = (time.perf_counter() - journal_start) * 1000
                 data["journals"] = journals
@@ -169,9 +198,9 @@ class DataRetriever:
         total_duration = (time.perf_counter() - total_start) * 1000
         self.timings["total"] = total_duration
         
-        timing_breakdown = " | ".join([f"{k}={v:.0f}ms" for k, v in self.timings.items()])
-        sources = list(data.keys())
-        record_counts = {k: len(v) if isinstance(v, list) else 1 for k, v in data.items()}
-        
-        logger.info(f"[RETRIEVER] Completed (anchored) | sources={sources} | records={record_counts} | {timing_breakdown}")
+        if logger.isEnabledFor(logging.INFO):
+            timing_breakdown = " | ".join([f"{k}={v:.0f}ms" for k, v in self.timings.items()])
+            sources = list(data.keys())
+            record_counts = {k: len(v) if isinstance(v, list) else 1 for k, v in data.items()}
+            logger.info(f"[RETRIEVER] Completed (anchored) | sources={sources} | records={record_counts} | {timing_breakdown}")
         return data
\ No newline at end of file
@@ -1,7 +1,9 @@
 import time
 import json
+from functools import lru_cache
 from typing import Optional
 from src.config import settings
+from src.embeddings import normalize_text
 from src.logger import get_logger
 from src.utils.clients import get_openai_client, get_openrouter_client
 from .followup_detector import RuleBasedFollowupDetector
@@ -40,6 +42,13 @@ Constraints:
 - If the user asks to perform an action (update, delete), classify as "general_chat" (the system will handle the refusal).
 """
 
+FOLLOWUP_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=FOLLOWUP_CACHE_SIZE)
+def _detect_followup_cached(current_query: str, previous_query: str) -> dict:
+    """Memoized rule-based detection keyed on normalized (current, previous) query pairs."""
+    return RuleBasedFollowupDetector.detect(current_query, previous_query)
+
 class QueryRouter:
     """
     Routes and classifies user queries to determine data sources and follow-up status.
@@ -131,8 +140,9 @@ class QueryRouter:
         logger.info(f"[ROUTER] Detecting follow-up | current='{query_preview}'")
         
         try:
-            # Use rule-based detection
-            result = RuleBasedFollowupDetector.detect(current_query, previous_query)
+            # Use rule-based detection; retries and reloads of the same pair hit the cache
+            # Copy so callers can't mutate the cached result
+            result = dict(_detect_followup_cached(normalize_text(current_query), normalize_text(previous_query)))
             
             total_duration = (time.perf_counter() - start_time) * 1000
             
@@ -152,3 +162,8 @@ class QueryRouter:
                 "confidence": 0.0,
                 "reasoning": f"Detection failed: {str(e)}"
             }
+
+@lru_cache(maxsize=1)
+def get_query_router() -> QueryRouter:
+    """Shared QueryRouter so LLM clients and config are reused across requests."""
+    return QueryRouter()
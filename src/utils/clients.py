@@ -1,12 +1,21 @@
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 from src.config import settings
 from src.logger import get_logger
 
 logger = get_logger(__name__)
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# httpx drops idle keep-alive connections after 5s by default; sync calls (summaries, routing) are sparse,
+# so keep TLS connections to the provider warm for a minute between them
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32, keepalive_expiry=60)
+
 # Global client instances (lazy initialization)
 _openrouter_client = None
 _openai_client = None
+_async_openrouter_client = None
+_async_openai_client = None
 
 def get_openrouter_client() -> OpenAI:
     """
@@ -18,7 +27,8 @@ def get_openrouter_client() -> OpenAI:
         logger.debug("[CLIENTS] Initializing OpenRouter client")
         _openrouter_client = OpenAI(
             api_key=settings.openrouter_api_key,
-            base_url="https://openrouter.ai/api/v1"
+            base_url=OPENROUTER_BASE_URL,
+            http_client=DefaultHttpxClient(limits=HTTP_LIMITS)
         )
     return _openrouter_client
 
@@ -31,10 +41,40 @@ def get_openai_client() -> OpenAI:
     if _openai_client is None:
         logger.debug("[CLIENTS] Initializing OpenAI client")
         _openai_client = OpenAI(
-            api_key=settings.openai_api_key
+            api_key=settings.openai_api_key,
+            http_client=DefaultHttpxClient(limits=HTTP_LIMITS)
         )
     return _openai_client
 
+def get_async_openrouter_client() -> AsyncOpenAI:
+    """
+    Get or create a shared async OpenRouter client.
+    Used for streaming so token waits do not block the event loop.
+    """
+    global _async_openrouter_client
+    if _async_openrouter_client is None:
+        logger.debug("[CLIENTS] Initializing async OpenRouter client")
+        _async_openrouter_client = AsyncOpenAI(
+            api_key=settings.openrouter_api_key,
+            base_url=OPENROUTER_BASE_URL,
+            http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS)
+        )
+    return _async_openrouter_client
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Get or create a shared async OpenAI client.
+    Used for streaming so token waits do not block the event loop.
+    """
+    global _async_openai_client
+    if _async_openai_client is None:
+        logger.debug("[CLIENTS] Initializing async OpenAI client")
+        _async_openai_client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS)
+        )
+    return _async_openai_client
+
 def get_llm_client():
     """
     Get the appropriate LLM client based on the configured provider.
@@ -1,21 +1,12 @@
-import json
-from datetime import date, datetime
 from decimal import Decimal
 
 
-class PostgreSQLEncoder(json.JSONEncoder):
+def pg_default(obj):
     """
-    JSON encoder to handle PostgreSQL/Python types.
+    orjson `default=` hook for PostgreSQL/Python types.
     
-    Handles:
-    - Decimal -> float
-    - datetime -> ISO format string
-    - date -> ISO format string
+    orjson serializes datetime/date natively; only Decimal needs a fallback.
     """
-    
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,5 +1,5 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance
+from qdrant_client.models import VectorParams, Distance, KeywordIndexParams, PayloadSchemaType
 from src.config import settings
 from src.logger import get_logger
 
@@ -7,13 +7,20 @@ logger = get_logger(__name__)
 
 _client = None
 
+# Every search filters on the owning user; a tenant keyword index keeps filtered HNSW search from scanning
+TENANT_FIELD = "user_id"
+
 class QdrantConnector:
     def __init__(self, collection_name: str):
         global _client
         if _client is None:
-            logger.info(f"Connecting to Qdrant at {settings.qdrant_url}")
+            logger.info(f"Connecting to Qdrant at {settings.qdrant_url} | grpc={settings.qdrant_prefer_grpc}")
             try:
-                _client = QdrantClient(url=settings.qdrant_url)
+                _client = QdrantClient(
+                    url=settings.qdrant_url,
+                    prefer_grpc=settings.qdrant_prefer_grpc,
+                    grpc_options={"grpc.keepalive_time_ms": 10000} if settings.qdrant_prefer_grpc else None
+                )
             except Exception as e:
                 logger.error(f"Failed to connect to Qdrant: {e}")
                 raise
@@ -42,6 +49,28 @@ class QdrantConnector:
                 )
             else:
                 logger.debug(f"Qdrant collection '{collection_name}' already exists")
+            self._ensure_tenant_index(client, collection_name)
         except Exception as e:
             logger.error(f"Error checking/creating Qdrant collection: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def _ensure_tenant_index(client: QdrantClient, collection_name: str):
+        """Create the user_id keyword payload index if the collection doesn't have it yet."""
+        payload_schema = client.get_collection(collection_name).payload_schema or {}
+        if TENANT_FIELD in payload_schema:
+            return
+        logger.info(f"Creating '{TENANT_FIELD}' payload index on Qdrant collection '{collection_name}'")
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=TENANT_FIELD,
+            field_schema=KeywordIndexParams(type=PayloadSchemaType.KEYWORD, is_tenant=True)
+        )
+
+def close_qdrant_client() -> None:
+    """Close the shared Qdrant client."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        logger.info("Closed Qdrant client")
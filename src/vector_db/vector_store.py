@@ -4,7 +4,7 @@ from typing import List, Optional
 
 from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
 
-from src.embeddings import get_embedding_from_cache
+from src.embeddings import get_embedding_from_cache, get_embeddings_from_cache
 from src.logger import get_logger
 from .qdrant_client import QdrantConnector
 
@@ -41,8 +41,38 @@ class JournalStore:
             raise
 
     @classmethod
-    def search_journals(cls, user_id: str, query_text: str, limit: int = 5) -> List[dict]:
-        """Search for relevant journal entries for a user based on query text."""
+    def upsert_journals(cls, entries: List[dict]):
+        """Upsert several journal entries (user_id, text, tags, created_at) with one batch embed and one Qdrant call."""
+        if not entries:
+            return
+        try:
+            client = cls.connector.get_qdrant_client()
+            embeddings = get_embeddings_from_cache([entry["text"] for entry in entries])
+            points = [
+                PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=embedding,
+                    payload={
+                        "user_id": entry["user_id"],
+                        "text": entry["text"],
+                        "tags": entry.get("tags", []),
+                        "created_at": entry["created_at"]
+                    }
+                )
+                for entry, embedding in zip(entries, embeddings)
+            ]
+            client.upsert(
+                collection_name=cls.COLLECTION_NAME,
+                points=points
+            )
+            logger.debug(f"Upserted {len(points)} journal entries")
+        except Exception as e:
+            logger.error(f"Failed to upsert batch of {len(entries)} journal entries: {e}")
+            raise
+
+    @classmethod
+    def search_journals(cls, user_id: str, query_text: str, limit: int = 5, query_embedding: Optional[List[float]] = None) -> List[dict]:
+        """Search for relevant journal entries for a user based on query text. Pass query_embedding to skip re-embedding."""
         total_start = time.perf_counter()
         query_preview = query_text[:50] + "..." if len(query_text) > 50 else query_text
         
@@ -53,7 +83,8 @@ class JournalStore:
             
             # Get embedding (may be cached)
             embed_start = time.perf_counter()
-            query_embedding = get_embedding_from_cache(query_text)
+            if query_embedding is None:
+                query_embedding = get_embedding_from_cache(query_text)
             embed_duration = (time.perf_counter() - embed_start) * 1000
             
             filter_condition = Filter(
@@ -161,14 +192,15 @@ class AssistantConversationStore:
     connector = QdrantConnector(collection_name=COLLECTION_NAME)
     
     @classmethod
-    def upsert_conversation(cls, user_id: str, session_id: Optional[str], messages: List[dict], conversation_summary: Optional[str] = None):
+    def upsert_conversation(cls, user_id: str, session_id: Optional[str], messages: List[dict], conversation_summary: Optional[str] = None) -> bool:
         """
         Upsert conversation history into Qdrant with smart compression.
+        Returns True if the conversation was stored (False when skipped as trivial).
         """
         # Skip trivial conversations
         if len(messages) < cls.MIN_MESSAGES_TO_STORE:
             logger.debug(f"[VECTOR_UPSERT] Skipping - too few messages ({len(messages)} < {cls.MIN_MESSAGES_TO_STORE})")
-            return
+            return False
         
         try:
             client = cls.connector.get_qdrant_client()
@@ -213,16 +245,18 @@ class AssistantConversationStore:
                 points=[point]
             )
             logger.info(f"[VECTOR_UPSERT] Stored conversation | user={user_id} | session={session_id[:8] if session_id else 'none'}... | messages={len(messages)} | has_summary={conversation_summary is not None}")
+            return True
         except Exception as e:
             logger.error(f"[VECTOR_UPSERT] Failed to upsert conversation for user {user_id} for session {session_id}: {e}")
             raise
     
     @classmethod
-    def search_conversations(cls, user_id: str, query_text: str, limit: int = 3) -> List[dict]:
-        """Search for relevant past conversations based on query text."""
+    def search_conversations(cls, user_id: str, query_text: str, limit: int = 3, query_embedding: Optional[List[float]] = None) -> List[dict]:
+        """Search for relevant past conversations based on query text. Pass query_embedding to skip re-embedding."""
         try:
             client = cls.connector.get_qdrant_client()
-            query_embedding = get_embedding_from_cache(query_text)
+            if query_embedding is None:
+                query_embedding = get_embedding_from_cache(query_text)
             filter_condition = Filter(
                 must=[
                     FieldCondition(
@@ -0,0 +1,19 @@
+import fakeredis.aioredis
+import pytest
+import qdrant_client
+
+from src.vector_db import qdrant_client as qdrant_connector
+
+# The vector stores connect when src.vector_db.vector_store is imported; point them at Qdrant's local mode
+qdrant_connector._client = qdrant_client.QdrantClient(location=":memory:")
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """In-process Redis behind get_redis() for the session and stream-log code."""
+    from src.cache import session, stream_log
+
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(session, "get_redis", lambda: client)
+    monkeypatch.setattr(stream_log, "get_redis", lambda: client)
+    return client
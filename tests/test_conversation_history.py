@@ -0,0 +1,73 @@
+import asyncio
+import uuid
+
+import pytest
+from qdrant_client.models import PointStruct
+
+from src.api import helpers
+from src.cache.session import USER_HISTORY_KEY, SessionManager
+from src.config import settings
+from src.vector_db.vector_store import AssistantConversationStore
+
+EMBEDDING = [1.0] + [0.0] * (settings.embedding_dimension - 1)
+
+
+@pytest.fixture
+def session_manager(fake_redis, monkeypatch):
+    # The history markers are static methods, so the class stands in for the shared instance
+    monkeypatch.setattr(helpers, "get_session_manager", lambda: SessionManager)
+    return SessionManager
+
+
+def store_conversation(user_id: str):
+    """A conversation already in Qdrant, stored before the history markers existed."""
+    AssistantConversationStore.connector.get_qdrant_client().upsert(
+        collection_name=AssistantConversationStore.COLLECTION_NAME,
+        points=[PointStruct(
+            id=str(uuid.uuid4()),
+            vector=EMBEDDING,
+            payload={"user_id": user_id, "messages": [{"role": "user", "content": "how did I trade in May?"}]}
+        )]
+    )
+
+
+def find(user_id: str) -> list:
+    return asyncio.run(helpers.find_relevant_conversations(user_id, "my May trades", EMBEDDING))
+
+
+def test_unmarked_user_with_stored_conversations_is_searched_and_marked(session_manager, fake_redis):
+    store_conversation("existing-user")
+
+    results = find("existing-user")
+
+    assert len(results) == 1
+    assert asyncio.run(fake_redis.hget(USER_HISTORY_KEY, "existing-user")) == b"1"
+
+
+def test_user_without_conversations_is_searched_once(session_manager, fake_redis, monkeypatch):
+    assert find("new-user") == []
+    assert asyncio.run(session_manager.user_has_history("new-user")) is False
+
+    def fail(*args, **kwargs):
+        raise AssertionError("searched a user known to have no conversations")
+
+    monkeypatch.setattr(AssistantConversationStore, "search_conversations", fail)
+    assert find("new-user") == []
+
+
+def test_stored_conversation_overrides_a_negative_marker(session_manager):
+    asyncio.run(session_manager.mark_user_without_history("returning-user"))
+    asyncio.run(session_manager.mark_user_history("returning-user"))
+    asyncio.run(session_manager.mark_user_without_history("returning-user"))
+
+    assert asyncio.run(session_manager.user_has_history("returning-user")) is True
+
+
+def test_failed_search_records_nothing(session_manager, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("qdrant unavailable")
+
+    monkeypatch.setattr(AssistantConversationStore, "search_conversations", fail)
+
+    assert find("flaky-user") == []
+    assert asyncio.run(session_manager.user_has_history("flaky-user")) is None
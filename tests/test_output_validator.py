@@ -0,0 +1,69 @@
+import random
+import re
+
+import pytest
+
+from src.llm import output_validator
+from src.llm.output_validator import OutputValidator
+
+SAMPLES = [
+    "Your win rate is 60% on EURUSD.",
+    "contact me at a.b@c.com or password: hunter2",
+    "sk-abcdefghijklmnopqrstuvwxyz12 and Bearer abc.def",
+    "use -- comment and DROP TABLE x",
+    "user_id = 42 of yours",
+    "ip 10-20-30-40 and postgres://u:p@h",
+    "API_KEY=xyz token: abc",
+    "Normal text with SELECT * FROM trades",
+    "x--a@b.co",  # Overlapping matches: the SQL comment and the email are redacted separately
+    "to\u212aen: abc",  # Kelvin sign: lowercases to "k", so the token pattern fires
+]
+
+# Fragments that trigger each pattern class, plus separators that make matches abut and overlap
+FRAGMENTS = [
+    "1-2-3-4", "10:20:30:40", "select *", "DROP table", "--", "password: x", "tOKEN: q", "bearer abc",
+    "a@b.co", "user_id=42", "you", "sk-" + "a" * 22, "postgres://u:p@h", "ssn=1", "\u0130", "\u212a",
+    " ", "-", ":", "=", "x", "9",
+]
+
+
+def baseline_sanitize(output: str) -> str:
+    """The original loop: detect on the lowercased output, redact case-insensitively, pattern by pattern."""
+    response_lower = output.lower()
+    for pattern in OutputValidator.FORBIDDEN_PATTERNS:
+        if re.search(pattern, response_lower):
+            output = re.sub(pattern, "[REDACTED]", output, flags=re.IGNORECASE)
+    return output
+
+
+def fuzz_inputs(count: int = 5000, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8)))
+
+
+def test_sanitize_output_redacts_forbidden_patterns():
+    assert OutputValidator.sanitize_output(SAMPLES[0]) == SAMPLES[0]
+    assert OutputValidator.sanitize_output(SAMPLES[1]) == "contact me at [REDACTED] or [REDACTED]"
+    assert OutputValidator.sanitize_output(SAMPLES[3]) == "use [REDACTED] comment and [REDACTED] x"
+    assert OutputValidator.sanitize_output(SAMPLES[8]) == "x[REDACTED][REDACTED]"
+
+
+@pytest.mark.parametrize("prefilter", [True, False])
+def test_sanitize_output_matches_the_original_loop(monkeypatch, prefilter):
+    if not prefilter:
+        monkeypatch.setattr(output_validator, "_prefilter", None)
+    for text in [*SAMPLES, *fuzz_inputs()]:
+        assert OutputValidator.sanitize_output(text) == baseline_sanitize(text), text
+
+
+def test_hyperscan_prefilter_matches_re_only_path(monkeypatch):
+    pytest.importorskip("hyperscan")
+    assert output_validator._prefilter is not None
+
+    assert not output_validator._prefilter_matches(SAMPLES[0].lower())
+    assert all(output_validator._prefilter_matches(text.lower()) for text in SAMPLES[1:])
+
+    with_prefilter = [OutputValidator.sanitize_output(text) for text in SAMPLES]
+    monkeypatch.setattr(output_validator, "_prefilter", None)
+    assert with_prefilter == [OutputValidator.sanitize_output(text) for text in SAMPLES]
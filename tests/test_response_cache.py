@@ -0,0 +1,155 @@
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.api import app as app_module
+from src.api import helpers
+from src.api.schemas import ChatRequest
+from src.cache.response import ResponseCache
+from src.llm.response_generator import LLM_FALLBACK_RESPONSE, ResponseGenerator
+
+RETRIEVED = {"trades": [{"id": 1, "symbol": "AAPL", "pnl": -120.5}], "journals": []}
+
+
+class FailingCompletions:
+    async def create(self, **kwargs):
+        raise RuntimeError("upstream timeout")
+
+
+def failing_generator() -> ResponseGenerator:
+    generator = ResponseGenerator.__new__(ResponseGenerator)
+    generator.provider = "openrouter"
+    generator.model = "test-model"
+    generator.async_client = SimpleNamespace(chat=SimpleNamespace(completions=FailingCompletions()))
+    return generator
+
+
+def fake_retriever():
+    return SimpleNamespace(
+        query_analysis={"query_type": "trade_only"},
+        date_context=None,
+        current_date=datetime(2026, 1, 5)
+    )
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(helpers, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(app_module, "get_response_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def no_turn_writes(monkeypatch):
+    async def _noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(helpers, "save_assistant_turn", _noop)
+    monkeypatch.setattr(app_module, "get_session_manager", lambda: SimpleNamespace(add_message=_noop))
+
+
+def test_failed_llm_stream_is_not_cached(monkeypatch, response_cache, no_turn_writes):
+    monkeypatch.setattr(helpers, "get_response_generator", failing_generator)
+    request = ChatRequest(user_id="u1", query="show my AAPL losses", stream=True)
+
+    async def run():
+        return [
+            frame async for frame in helpers.generate_stream_response(
+                request, fake_retriever(), RETRIEVED, time.perf_counter(), relevant_conversations=[]
+            )
+        ]
+
+    frames = b"".join(asyncio.run(run()))
+    assert LLM_FALLBACK_RESPONSE.encode() in frames
+    assert b"event: done" in frames
+    assert not response_cache._buckets
+
+
+def test_failed_llm_response_is_not_cached(monkeypatch, response_cache, no_turn_writes):
+    monkeypatch.setattr(app_module, "get_response_generator", failing_generator)
+    request = ChatRequest(user_id="u1", query="show my AAPL losses", session_id="s1")
+
+    async def prepare_turn(_request):
+        return {
+            "session": None,
+            "retriever": fake_retriever(),
+            "retrieved_data": RETRIEVED,
+            "retriever_duration": 0.0,
+            "is_followup": False,
+            "anchor_scope": None,
+            "trade_scope": None,
+            "is_in_domain": True,
+            "query_type": "trade_only",
+            "session_write": None,
+            "relevant_conversations": [],
+            "query_embedding": None,
+        }
+
+    monkeypatch.setattr(app_module, "prepare_chat_turn", prepare_turn)
+    http_request = SimpleNamespace(state=SimpleNamespace(request_id="r1", t0=time.perf_counter()))
+
+    response = asyncio.run(app_module.chat_endpoint(request, http_request))
+    assert LLM_FALLBACK_RESPONSE.encode() in response.body
+    assert not response_cache._buckets
+
+
+def staged_session(*messages):
+    """Session as the LLM step sees it: prior messages plus the staged current user message."""
+    return {"messages": [{"role": role, "content": content} for role, content in messages]}
+
+
+def run_stream_turn(query, session, embedding):
+    request = ChatRequest(user_id="u1", query=query, stream=True)
+
+    async def run():
+        return [
+            frame async for frame in helpers.generate_stream_response(
+                request, fake_retriever(), RETRIEVED, time.perf_counter(),
+                session=session, relevant_conversations=[], query_embedding=embedding
+            )
+        ]
+
+    return b"".join(asyncio.run(run()))
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    async def generate_response_stream(user_query, **kwargs):
+        calls.append(user_query)
+        yield "You lost $120.50 on AAPL."
+
+    monkeypatch.setattr(
+        helpers, "get_response_generator",
+        lambda: SimpleNamespace(generate_response_stream=generate_response_stream)
+    )
+    return calls
+
+
+def test_paraphrased_query_hits_the_cache(response_cache, no_turn_writes, llm_calls):
+    first = run_stream_turn("show my AAPL losses", staged_session(("user", "show my AAPL losses")), [1.0, 0.0, 0.0])
+    second = run_stream_turn(
+        "what did I lose on AAPL?", staged_session(("user", "what did I lose on AAPL?")), [0.99, 0.1, 0.0]
+    )
+
+    assert llm_calls == ["show my AAPL losses"]
+    assert b'"cached":false' in first
+    assert b'"cached":true' in second and b"You lost $120.50 on AAPL." in second
+
+
+def test_different_history_does_not_share_answers(response_cache, no_turn_writes, llm_calls):
+    run_stream_turn("show my AAPL losses", staged_session(("user", "show my AAPL losses")), [1.0, 0.0, 0.0])
+    other_history = staged_session(
+        ("user", "only count trades from my IRA"),
+        ("assistant", "Noted."),
+        ("user", "show my AAPL losses"),
+    )
+    frames = run_stream_turn("show my AAPL losses", other_history, [1.0, 0.0, 0.0])
+
+    assert len(llm_calls) == 2
+    assert b'"cached":false' in frames
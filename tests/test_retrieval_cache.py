@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.cache.retrieval import RetrievalCache
+from src.orchestration import retriever as retriever_module
+from src.orchestration.retriever import DataRetriever
+
+TRADES = {
+    "aapl": [{"id": 1, "symbol": "AAPL", "pnl": -120.5}],
+    "tsla": [{"id": 2, "symbol": "TSLA", "pnl": -75.0}],
+}
+
+
+def symbol_of(query):
+    return "tsla" if "tsla" in query.lower() else "aapl"
+
+
+@pytest.fixture
+def routed_queries(monkeypatch):
+    """Fresh retrieval cache, a router that records its calls, and trade lookups for the routed symbol."""
+    routed = []
+
+    def analyze_query(query):
+        routed.append(query)
+        return {"query_type": "trade_only", "is_in_domain": True, "symbol": symbol_of(query)}
+
+    def get_trades_by_date_range(user_id, start, end):
+        return TRADES[symbol_of(routed[-1])]
+
+    cache = RetrievalCache()
+    monkeypatch.setattr(retriever_module, "get_retrieval_cache", lambda: cache)
+    monkeypatch.setattr(retriever_module, "get_query_router", lambda: SimpleNamespace(analyze_query=analyze_query))
+    monkeypatch.setattr(retriever_module.TradeQueries, "get_trades_by_date_range", get_trades_by_date_range)
+    return routed
+
+
+def retrieve(query):
+    retriever = DataRetriever(user_id="u1")
+    # Identical embeddings: only the query text may tell the two apart
+    return retriever.retrieve_data(query, query_embedding=[1.0, 0.0, 0.0]), retriever.query_analysis
+
+
+def test_repeated_query_hits_after_normalization(routed_queries):
+    first, _ = retrieve("AAPL losses last week")
+    second, analysis = retrieve("  aapl   LOSSES last week ")
+
+    assert routed_queries == ["AAPL losses last week"]
+    assert second == first == {"trades": TRADES["aapl"]}
+    assert analysis["symbol"] == "aapl"
+
+
+def test_similar_query_for_another_symbol_misses(routed_queries):
+    retrieve("AAPL losses last week")
+    data, analysis = retrieve("TSLA losses last week")
+
+    assert routed_queries == ["AAPL losses last week", "TSLA losses last week"]
+    assert data == {"trades": TRADES["tsla"]}
+    assert analysis["symbol"] == "tsla"
+
+
+def test_entries_expire():
+    cache = RetrievalCache(ttl=0)
+    cache.put("u1", "AAPL losses", None, {"data": {}, "query_analysis": {}})
+    assert cache.get("u1", "AAPL losses", None) is None
@@ -0,0 +1,180 @@
+import asyncio
+
+import orjson
+import pytest
+import redis
+
+from src.cache import session as session_module
+from src.cache.session import (
+    MAX_STORED_MESSAGES,
+    PERSISTED_STATE_FIELD,
+    RECENT_MESSAGES_TO_KEEP,
+    SUMMARY_TRIGGER_MESSAGE_COUNT,
+    SessionManager,
+)
+
+
+class WhitespaceEncoding:
+    """Stands in for cl100k_base, which tiktoken downloads on first use, so the tests run offline."""
+
+    @staticmethod
+    def encode_ordinary(text: str) -> list:
+        return text.split()
+
+
+@pytest.fixture
+def manager(fake_redis, monkeypatch):
+    monkeypatch.setattr(session_module, "get_encoding", lambda name: WhitespaceEncoding())
+    manager = SessionManager()
+    manager._call_summary_llm = lambda conversation_text: "SUMMARY"
+    return manager
+
+
+def list_commands(commands: list) -> list:
+    """(command, key, item count) for the list writes of a _build_write result."""
+    return [(name, args[0], len(args) - 1) for name, args, *_ in commands if name in ("delete", "rpush")]
+
+
+async def stored_contexts(fake_redis, session_id: str) -> list:
+    raw = await fake_redis.lrange(f"session:{session_id}:query_contexts", 0, -1)
+    return [SessionManager._decode_query_context(item)["user_message"] for item in raw]
+
+
+def test_new_session_is_written_in_full_then_appended(manager, fake_redis):
+    async def run():
+        session = manager.create_session("s1", "u1")
+        session = await manager.add_message("s1", "user", "first question", session=session, persist=False)
+        first_write, _ = SessionManager._build_write("s1", session)
+
+        session = await manager.add_message("s1", "assistant", "first answer", session=session, persist=False)
+        second_write, _ = SessionManager._build_write("s1", session)
+        return first_write, second_write
+
+    first_write, second_write = asyncio.run(run())
+
+    assert list_commands(first_write) == [
+        ("delete", "session:s1", 2),
+        ("rpush", "session:s1:messages", 1),
+    ]
+    assert list_commands(second_write) == [("rpush", "session:s1:messages", 1)]
+
+
+def test_dropped_messages_rewrite_only_the_message_list(manager, fake_redis):
+    async def run():
+        session = manager.create_session("s1", "u1")
+        for i in range(3):
+            session = await manager.add_message("s1", "user", f"question {i}", session=session)
+        manager._drop_oldest_messages(session, 1)
+        commands, _ = SessionManager._build_write("s1", session)
+        await SessionManager._execute_write(commands)
+        stored = await fake_redis.lrange("session:s1:messages", 0, -1)
+        return commands, [orjson.loads(item)["content"] for item in stored]
+
+    commands, stored = asyncio.run(run())
+
+    assert list_commands(commands) == [
+        ("delete", "session:s1:messages", 0),
+        ("rpush", "session:s1:messages", 2),
+    ]
+    assert stored == ["question 1", "question 2"]
+
+
+def fail_next_write(monkeypatch):
+    execute_write = SessionManager._execute_write
+    calls = []
+
+    async def flaky(commands):
+        calls.append(commands)
+        if len(calls) == 1:
+            raise redis.ConnectionError("connection reset during EXEC")
+        await execute_write(commands)
+
+    monkeypatch.setattr(SessionManager, "_execute_write", staticmethod(flaky))
+    return calls
+
+
+def test_failed_save_rolls_back_and_the_retry_appends(manager, fake_redis, monkeypatch):
+    async def run():
+        session = manager.create_session("s1", "u1")
+        for i in range(3):
+            session = await manager.add_query_context("s1", f"q{i}", {"trades": [{"trade_id": i}]}, session=session)
+        # A later request loads only the latest query context, then stages and saves a new one
+        session = await manager.get_session("s1")
+        persisted_before = dict(session[PERSISTED_STATE_FIELD])
+        session = await manager.add_query_context("s1", "q3", {"trades": [{"trade_id": 3}]}, session=session, persist=False)
+
+        calls = fail_next_write(monkeypatch)
+        with pytest.raises(redis.ConnectionError):
+            await manager.save_session("s1", session)
+        rolled_back = dict(session[PERSISTED_STATE_FIELD])
+        after_failure = await stored_contexts(fake_redis, "s1")
+
+        await manager.save_session("s1", session)
+        return persisted_before, rolled_back, after_failure, calls[1], await stored_contexts(fake_redis, "s1")
+
+    persisted_before, rolled_back, after_failure, retry, stored = asyncio.run(run())
+
+    assert rolled_back == persisted_before
+    assert after_failure == ["q0", "q1", "q2"]
+    assert list_commands(retry) == [("rpush", "session:s1:query_contexts", 1)]
+    assert stored == ["q0", "q1", "q2", "q3"]
+
+
+def test_failed_background_save_rolls_back(manager, fake_redis, monkeypatch):
+    async def run():
+        session = manager.create_session("s1", "u1")
+        session = await manager.add_message("s1", "user", "question", session=session, persist=False)
+        fail_next_write(monkeypatch)
+        with pytest.raises(redis.ConnectionError):
+            await manager.save_session_in_background("s1", session)
+        rolled_back = PERSISTED_STATE_FIELD in session
+
+        await manager.save_session_in_background("s1", session)
+        return rolled_back, await manager.get_session("s1")
+
+    rolled_back, stored = asyncio.run(run())
+
+    assert not rolled_back  # New session: the retry is a full write again
+    assert [message["content"] for message in stored["messages"]] == ["question"]
+
+
+def test_summary_is_scheduled_and_applied_on_the_next_message(manager, fake_redis):
+    async def run():
+        session = manager.create_session("s1", "u1")
+        for i in range(SUMMARY_TRIGGER_MESSAGE_COUNT + 1):
+            session = await manager.add_message("s1", "user", f"message {i}", session=session)
+        scheduled = session["summary_in_progress_at"] is not None
+        await asyncio.gather(*session_module._summary_jobs)
+
+        session = await manager.get_session("s1")
+        session = await manager.add_message("s1", "user", "after summary", session=session)
+        return scheduled, session, await manager.get_session("s1"), await fake_redis.exists("session:s1:pending_summary")
+
+    scheduled, session, stored, pending_left = asyncio.run(run())
+
+    assert scheduled
+    assert session["conversation_summary"] == "SUMMARY"
+    assert session["messages_summarized_count"] == SUMMARY_TRIGGER_MESSAGE_COUNT + 1 - RECENT_MESSAGES_TO_KEEP
+    assert [m["content"] for m in stored["messages"]] == [m["content"] for m in session["messages"]]
+    assert len(stored["messages"]) == RECENT_MESSAGES_TO_KEEP + 1
+    assert stored["total_token_count"] == manager.total_token_count(stored["messages"])
+    assert not pending_left
+
+
+def test_messages_are_capped_when_summaries_fail(manager, fake_redis):
+    manager._call_summary_llm = lambda conversation_text: None
+
+    async def run():
+        session = manager.create_session("s1", "u1")
+        for i in range(MAX_STORED_MESSAGES + 5):
+            session = await manager.add_message("s1", "user", f"message {i}", session=session)
+            await asyncio.gather(*session_module._summary_jobs)
+        return session, await manager.get_session("s1")
+
+    session, stored = asyncio.run(run())
+
+    expected = [f"message {i}" for i in range(5, MAX_STORED_MESSAGES + 5)]
+    assert [m["content"] for m in session["messages"]] == expected
+    assert [m["content"] for m in stored["messages"]] == expected
+    assert stored["total_token_count"] == manager.total_token_count(stored["messages"])
+    assert stored["conversation_summary"] is None
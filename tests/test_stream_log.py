@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import helpers
+from src.api.app import app
+from src.cache.stream_log import get_stream_log
+
+OWNER = {"user_id": "u1", "session_id": "s1"}
+
+
+async def chat_frames(chunks: int = 3, pages: int = 2):
+    """Frames in the order generate_chat_stream emits them."""
+    yield helpers._sse("status", {"phase": "retrieving"})
+    yield helpers._sse("start", {"session_id": "s1"})
+    for page in range(pages):
+        yield helpers._sse("trades", {"page": page, "rows": [{"id": page}]})
+    yield helpers._sse("data_end", {"trades": pages, "journals": 0})
+    for i in range(chunks):
+        yield helpers._sse_chunk(f"part {i} ")
+        await asyncio.sleep(0)
+    yield helpers._sse("done", {"chunks": chunks})
+
+
+async def record(stream_id: str, frames) -> list:
+    live = [frame async for frame in helpers.resumable_stream(stream_id, frames, OWNER)]
+    await asyncio.gather(*helpers._stream_producers)
+    return live
+
+
+@pytest.fixture
+def stream_log(fake_redis):
+    get_stream_log.cache_clear()
+    yield get_stream_log()
+    get_stream_log.cache_clear()
+
+
+def test_only_resumable_frames_are_logged(stream_log):
+    live = asyncio.run(record("tok", chat_frames()))
+    logged, _ = asyncio.run(stream_log.read_from("tok", 0))
+
+    assert len(live) == 9
+    # status, start, 3 chunks, done; the data pages go out live only and carry no SSE id
+    assert logged == [frame for frame in live if frame.startswith(b"id: ")]
+    assert [frame.split(b"\n", 1)[0] for frame in logged] == [b"id: %d" % i for i in range(6)]
+    assert asyncio.run(stream_log.owner("tok")) == OWNER
+
+
+def test_replay_from_last_event_id(stream_log):
+    live = asyncio.run(record("tok", chat_frames()))
+
+    async def replay():
+        return [frame async for frame in helpers.replay_stream("tok", last_event_id=2)]
+
+    replayed = asyncio.run(replay())
+    assert replayed == [frame for frame in live if frame.startswith(b"id: ")][3:]
+    assert b"event: done" in replayed[-1]
+
+
+def test_producer_finishes_after_client_disconnect(stream_log):
+    async def disconnect_early():
+        stream = helpers.resumable_stream("tok", chat_frames(chunks=200), OWNER)
+        first = await stream.__anext__()
+        await stream.aclose()
+        await asyncio.wait_for(asyncio.gather(*helpers._stream_producers), 5)
+        return first
+
+    first = asyncio.run(disconnect_early())
+    logged, last = asyncio.run(stream_log.read_from("tok", 0))
+
+    assert b"event: status" in first
+    assert len(logged) == 203  # status, start, 200 chunks, done
+    assert b"event: done" in last
+
+
+def test_live_queue_is_bounded(stream_log, monkeypatch):
+    monkeypatch.setattr(helpers, "STREAM_QUEUE_MAX_FRAMES", 4)
+    produced = 0
+
+    async def counted_frames():
+        nonlocal produced
+        async for frame in chat_frames(chunks=50):
+            produced += 1
+            yield frame
+
+    async def slow_client():
+        stream = helpers.resumable_stream("tok", counted_frames(), OWNER)
+        await stream.__anext__()
+        await asyncio.sleep(0.05)
+        stalled_at = produced
+        rest = [frame async for frame in stream]
+        await asyncio.gather(*helpers._stream_producers)
+        return stalled_at, 1 + len(rest)
+
+    stalled_at, received = asyncio.run(slow_client())
+    # One frame taken, four queued, one more produced and waiting for room
+    assert stalled_at <= 6
+    assert received == produced == 56
+
+
+def test_resume_requires_the_owning_user_and_session(stream_log):
+    asyncio.run(record("tok", chat_frames()))
+    client = TestClient(app)
+
+    resumed = client.get("/chat/stream/tok", params=OWNER, headers={"Last-Event-ID": "4"})
+    assert resumed.status_code == 200
+    assert resumed.text.startswith("id: 5\nevent: done\n")
+
+    for params in ({"user_id": "u2", "session_id": "s1"}, {"user_id": "u1", "session_id": "s2"}, {"user_id": "u1"}):
+        assert client.get("/chat/stream/tok", params=params).status_code == 404
+    assert client.get("/chat/stream/unknown", params=OWNER).status_code == 404
+    assert client.get("/chat/stream/tok").status_code == 422